@@ -0,0 +1,242 @@
+"""
+Usage:
+  bench [--sizes=<s>] [--stage-rows=<r>] [--workers=<w>] [--out=<d>] [--baseline=<f>] [--save-baseline] [--tolerance=<t>]
+
+Options:
+  -h --help          Show help
+  --sizes=<s>        Rows in each synthetic data table [default: 1000,10000,100000,1000000]
+  --stage-rows=<r>   Largest table the build stages are run on [default: 10000]
+  --workers=<w>      Number of worker processes (default: one per core)
+  --out=<d>          Directory for the results and scaling plots [default: bench]
+  --baseline=<f>     Results to compare against [default: bench_baseline.json]
+  --save-baseline    Save these results as the baseline instead of comparing
+  --tolerance=<t>    Slowdown or memory growth allowed before flagging a
+                     regression [default: 0.25]
+
+Benchmarks for paper.py's hot paths, the Python side of tests.nim's
+-d:benchmark mode.
+
+Each benchmark runs on a synthetic data table of every size, built with the
+real schema by store.py. It is run once to warm up, e.g. to import scipy and
+matplotlib, then timed once plain and once under tracemalloc for its peak
+memory. Throughput is in the benchmark's own units (rows, groups, figures,
+or templates) per second.
+
+The build stages, fitting, plotting, bootstrapping and model selection, run
+as paper.py runs them: over every attempts value of the table, through a
+process pool, and from empty caches, except that plotting and bootstrapping
+start from the fits already made. Their peak memory is that of this process
+only, not the workers'. Since they grow with the number of attempts values,
+they are only run on tables no larger than the stage rows option allows.
+
+Results are saved to the output directory along with log-log plots of
+throughput and peak memory against table size, and any benchmark slower or
+hungrier than the baseline by more than the tolerance is flagged, failing
+the run.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from time import perf_counter
+
+import numpy as np
+import rapidjson as json
+
+import bootstrap
+import build
+import render
+import selection
+import snapshot
+import templates
+import zeta
+from fitcache import FitCache
+from models import exponential
+from store import open_db
+
+KS = 10
+P0 = [0, 1, .5, 0]
+
+def synthetic_db(fileloc, rows, seed=0):
+  """ A data table of about `rows` rows: KS values of k for each of rows / KS attempts values """
+  rng = np.random.default_rng(seed)
+  As = np.arange(1, max(rows // KS, 1) + 1) * 500_000
+  ks = np.arange(1, KS + 1)
+  attempts, k = (col.ravel() for col in np.meshgrid(As, ks, indexing="ij"))
+  n = np.maximum(k, np.round(.5 * np.exp(.95 * k) + rng.normal(0, 1 + k) + np.log(attempts / 5e5))).astype(np.int64)
+  conn = open_db(fileloc)
+  with conn:
+    conn.executemany(
+      "INSERT INTO data (attempts, c, k, n) VALUES (?, 2, ?, ?)",
+      zip(attempts.tolist(), k.tolist(), n.tolist()),
+    )
+  conn.close()
+
+# Each benchmark takes the database's file location, its snapshot, the pool,
+# and a fit cache holding the exponential fits, and returns how many units of
+# work it did
+
+def bench_query(db_fileloc, snap, pool, fits):
+  conn = snapshot.connect_ro(db_fileloc)
+  try:
+    return len(snapshot.read(conn).n)
+  finally:
+    conn.close()
+
+def bench_groups(db_fileloc, snap, pool, fits):
+  count = 0
+  for a, ks, ns in snap.groups():
+    count += 1
+  return count
+
+def bench_appx_zeta(db_fileloc, snap, pool, fits):
+  zeta.appx_zeta(snap.n, snap.k)
+  return len(snap.n)
+
+def bench_specify(db_fileloc, snap, pool, fits):
+  for a, ks, ns in snap.groups():
+    templates.specify(r"$[[a]]$ & $[[ks.max()]]$ & $[[ns.max():.2f]]$ \\", {"a": a, "ks": ks, "ns": ns})
+  return len(snap.As)
+
+def groups(snap):
+  return [snap.group(a) for a in snap.As]
+
+# The build stages
+
+def bench_fit(db_fileloc, snap, pool, fits):
+  with tempfile.TemporaryDirectory() as dirloc:
+    render.fit_all(pool, groups(snap), FitCache(os.path.join(dirloc, "fits.json")), exponential, P0)
+  return len(snap.As)
+
+def bench_kv_plots(db_fileloc, snap, pool, fits):
+  with tempfile.TemporaryDirectory() as dirloc:
+    manifest = build.Manifest(os.path.join(dirloc, "manifest.json"))
+    # Without a line per figure drawn
+    with redirect_stdout(io.StringIO()):
+      render.kv_plots(pool, snap, fits, exponential, P0, dirloc, manifest)
+  return len(snap.As)
+
+def bench_bootstrap(db_fileloc, snap, pool, fits):
+  paramss = render.fit_all(pool, groups(snap), fits, exponential, P0)
+  with tempfile.TemporaryDirectory() as dirloc:
+    replicates = bootstrap.SampleCache(os.path.join(dirloc, "bootstrap.npz"))
+    bootstrap.bootstrap_all(pool, groups(snap), replicates, exponential, P0, paramss)
+  return len(snap.As)
+
+def bench_select(db_fileloc, snap, pool, fits):
+  with tempfile.TemporaryDirectory() as dirloc:
+    selection.select(pool, groups(snap), FitCache(os.path.join(dirloc, "fits.json")))
+  return len(snap.As)
+
+BENCHMARKS = [
+  ("query", "rows", bench_query),
+  ("groups", "groups", bench_groups),
+  ("appx_zeta", "rows", bench_appx_zeta),
+  ("specify", "templates", bench_specify),
+]
+
+STAGES = [
+  ("fit", "groups", bench_fit),
+  ("kv_plots", "figures", bench_kv_plots),
+  ("bootstrap", "groups", bench_bootstrap),
+  ("select", "groups", bench_select),
+]
+
+def measure(bench, *args):
+  """ (units, seconds, peak bytes) of one benchmark """
+  # The first call pays for the lazy scipy and matplotlib imports, and for
+  # starting the workers, which would otherwise make the smallest tables
+  # look slowest
+  bench(*args)
+
+  t0 = perf_counter()
+  units = bench(*args)
+  seconds = perf_counter() - t0
+
+  tracemalloc.start()
+  try:
+    bench(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+  finally:
+    tracemalloc.stop()
+  return units, seconds, peak
+
+def run(sizes, stage_rows, workers=None):
+  results = {name: {} for name, unit, bench in BENCHMARKS + STAGES}
+  pool = render.pool(workers)
+  try:
+    for size in sizes:
+      with tempfile.TemporaryDirectory() as dirloc:
+        db_fileloc = os.path.join(dirloc, "data.db")
+        synthetic_db(db_fileloc, size)
+        snap = snapshot.load(db_fileloc, os.path.join(dirloc, "data.npz"))
+        benchmarks = BENCHMARKS
+        fits = FitCache(os.path.join(dirloc, "fits.json"))
+        if size <= stage_rows:
+          benchmarks = BENCHMARKS + STAGES
+          # The fits plotting and bootstrapping start from
+          render.fit_all(pool, groups(snap), fits, exponential, P0)
+        for name, unit, bench in benchmarks:
+          units, seconds, peak = measure(bench, db_fileloc, snap, pool, fits)
+          results[name][str(size)] = {"units": units, "seconds": seconds, "throughput": units / seconds, "peak": peak}
+          print(f"[rows={size}] {name:<10} :: {units / seconds:>14.1f} {unit}/s, peak {peak / 2**20:.2f} MiB")
+  finally:
+    pool.shutdown()
+  return results
+
+def plot(results, out_dir):
+  for key, title, label in (("throughput", "Throughput", "units/s"), ("peak", "Peak memory", "bytes")):
+    fig, ax = render.figure(f"{title} vs data table size", "rows", label)
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    for name, unit, bench in BENCHMARKS + STAGES:
+      sizes = sorted(results[name], key=int)
+      ax.plot([int(size) for size in sizes], [results[name][size][key] for size in sizes], marker="o", label=name)
+    ax.legend()
+    fig.savefig(os.path.join(out_dir, f"{key}.png"))
+
+def regressions(results, baseline, tolerance):
+  """ Messages for every benchmark and size slower or hungrier than the baseline """
+  messages = []
+  for name, by_size in results.items():
+    for size, result in by_size.items():
+      base = baseline.get(name, {}).get(size)
+      if base is None:
+        continue
+      if result["throughput"] < base["throughput"] * (1 - tolerance):
+        messages.append(f"{name} at {size} rows: {result['throughput']:.1f}/s, down from {base['throughput']:.1f}/s")
+      if result["peak"] > base["peak"] * (1 + tolerance):
+        messages.append(f"{name} at {size} rows: peak {result['peak']} bytes, up from {base['peak']}")
+  return messages
+
+if __name__ == "__main__":
+  from docopt import docopt
+
+  clargs = docopt(__doc__)
+  sizes = [int(size) for size in clargs["--sizes"].split(",")]
+  out_dir = clargs["--out"]
+  os.makedirs(out_dir, exist_ok=True)
+
+  workers = clargs["--workers"] and int(clargs["--workers"])
+  results = run(sizes, int(clargs["--stage-rows"]), workers)
+  with open(os.path.join(out_dir, "bench.json"), "w") as f:
+    json.dump(results, f, indent=2)
+  plot(results, out_dir)
+
+  baseline_fileloc = clargs["--baseline"]
+  if clargs["--save-baseline"]:
+    with open(baseline_fileloc, "w") as f:
+      json.dump(results, f, indent=2)
+    print(f"{baseline_fileloc} saved.")
+  elif os.path.isfile(baseline_fileloc):
+    with open(baseline_fileloc) as f:
+      baseline = json.load(f)
+    messages = regressions(results, baseline, float(clargs["--tolerance"]))
+    for message in messages:
+      print(f"REGRESSION: {message}")
+    if messages:
+      sys.exit(1)
+    print(f"No regressions against {baseline_fileloc}.")
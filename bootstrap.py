@@ -0,0 +1,166 @@
+"""
+Bootstrap confidence intervals for the k vs V fits.
+
+Resampling the rows of one attempts value only changes how many times each
+row counts, so a replicate is a weighted least-squares problem over the same
+k. All replicates are then refitted at once by one Levenberg-Marquardt loop
+over a batch of parameter vectors, with the Jacobians and damped normal
+equations of every replicate evaluated and solved together, each starting
+from the fit to the full data. Attempts values are bootstrapped side by side
+in the pool, and the replicates are cached next to the fits, in binary since
+there are thousands per attempts value.
+"""
+
+import os
+
+import numpy as np
+
+import tracing
+from build import digest
+from fitcache import fit_key
+
+REPLICATES = 2000
+SEED = 1118
+
+def batched_lm(func, xs, ys, weights, p0, iterations=500, tol=1e-10):
+  """
+  Minimize sum_i weights[r, i] (func(xs[i], *params[r]) - ys[i])^2 for every
+  row r of weights at once, starting every row from p0. Returns the (R, P)
+  fitted parameters and the (R,) costs.
+  """
+  xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+  params = np.tile(np.asarray(p0, dtype=np.float64), (len(weights), 1))
+  P = params.shape[1]
+  evaluations = 0
+
+  def residuals(params):
+    nonlocal evaluations
+    evaluations += len(params)
+    with np.errstate(all="ignore"):
+      return func(xs[None, :], *params.T[:, :, None]) - ys
+
+  def cost(r, weights=weights):
+    with np.errstate(all="ignore"):
+      total = (weights * r ** 2).sum(axis=1)
+    return np.where(np.isfinite(total), total, np.inf)
+
+  r = residuals(params)
+  costs = cost(r)
+  damping = np.full(len(weights), 1e-3)
+  active = np.isfinite(costs)
+
+  for _ in range(iterations):
+    if not active.any():
+      break
+    p, w, ra = params[active], weights[active], r[active]
+
+    # Forward-difference Jacobian of every active replicate, (R, N, P)
+    h = 1e-7 * np.maximum(np.abs(p), 1)
+    jac = np.stack([(residuals(p + h[:, j:j + 1] * np.eye(P)[j]) - ra) / h[:, j:j + 1] for j in range(P)], axis=2)
+    jac = np.where(np.isfinite(jac), jac, 0)
+
+    # Damped normal equations (J^T W J + damping * diag) step = -J^T W r
+    jtw = jac.transpose(0, 2, 1) * w[:, None, :]
+    jtj = jtw @ jac
+    grad = (jtw @ ra[:, :, None])[:, :, 0]
+    diag = np.diagonal(jtj, axis1=1, axis2=2)
+    lhs = jtj + (damping[active, None] * (diag + 1e-12))[:, :, None] * np.eye(P)
+    try:
+      step = np.linalg.solve(lhs, -grad[:, :, None])[:, :, 0]
+    except np.linalg.LinAlgError:
+      step = (np.linalg.pinv(lhs) @ -grad[:, :, None])[:, :, 0]
+
+    candidate = p + step
+    candidate_r = residuals(candidate)
+    candidate_costs = cost(candidate_r, w)
+    better = candidate_costs < costs[active]
+
+    # Accept improving steps and trust the model more; otherwise less
+    idx = np.flatnonzero(active)
+    improvement = costs[idx] - candidate_costs
+    params[idx[better]] = candidate[better]
+    r[idx[better]] = candidate_r[better]
+    costs[idx[better]] = candidate_costs[better]
+    damping[idx[better]] /= 10
+    damping[idx[~better]] *= 10
+
+    done = (better & (improvement <= tol * (1 + candidate_costs))) | (damping[idx] > 1e12)
+    active[idx[done]] = False
+
+  tracing.count("bootstrap evaluations", evaluations)
+  return params, costs
+
+def resample_weights(rng, count, replicates):
+  """ How many times each of `count` rows is drawn, for every replicate """
+  return rng.multinomial(count, np.full(count, 1 / count), size=replicates).astype(np.float64)
+
+def replicate_params(func, xs, ys, params, replicates=REPLICATES, seed=SEED):
+  """ (replicates, P) parameters fitted to resamples of the (xs, ys) rows """
+  # Keyed by the rows, so each group gets its own resamples whichever worker runs it
+  rows = np.concatenate([xs, ys]).astype(np.int64)
+  rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=tuple(rows.tolist())))
+  weights = resample_weights(rng, len(xs), replicates)
+  fitted, costs = batched_lm(func, xs, ys, weights, params)
+  fitted[~np.isfinite(costs)] = np.nan
+  return fitted
+
+def intervals(samples, level=.95):
+  """ (P, 2) percentile interval of each column, ignoring failed replicates """
+  tail = (1 - level) / 2 * 100
+  return np.nanpercentile(samples, [tail, 100 - tail], axis=0).T
+
+class SampleCache:
+  """ Like `FitCache`, for arrays of replicate parameters, in an .npz """
+
+  def __init__(self, fileloc):
+    self.fileloc = fileloc
+    self.saved = {}
+    if os.path.isfile(fileloc):
+      # Loads members lazily, so only the replicates asked for are read
+      self.saved = np.load(fileloc)
+    self.entries = {}
+    self.changed = False
+
+  def get(self, key):
+    if key not in self.entries and key in self.saved:
+      self.entries[key] = self.saved[key]
+    return self.entries.get(key)
+
+  def put(self, key, samples):
+    self.entries[key] = samples
+    self.changed = True
+
+  def save(self):
+    """ Write out the entries used since loading, unless that is what is saved already """
+    if not self.changed and set(self.entries) == set(self.saved):
+      return
+    if self.saved:
+      self.saved.close()
+    np.savez(self.fileloc, **self.entries)
+    tracing.count("bytes written", os.path.getsize(self.fileloc))
+
+def bootstrap_all(pool, groups, cache, func, p0, paramss, replicates=REPLICATES, seed=SEED):
+  """
+  Bootstrap the fit of func to every (xs, ys) group, from its fitted params.
+  Returns each group's (P, 2) intervals, and the (replicates, P) replicate
+  parameters averaged over the groups, for intervals of the mean.
+  """
+  keys = [
+    digest("bootstrap", fit_key(func, xs, ys, p0), params, replicates, seed)
+    for (xs, ys), params in zip(groups, paramss)
+  ]
+  cached = [cache.get(key) for key in keys]
+  futures = {
+    i: tracing.submit(pool, "bootstrap", replicate_params, func, xs, ys, params, replicates, seed, group=i)
+    for i, ((xs, ys), params, hit) in enumerate(zip(groups, paramss, cached))
+    if hit is None
+  }
+
+  samples = []
+  for i, (key, hit) in enumerate(zip(keys, cached)):
+    if hit is None:
+      hit = futures[i].result()
+      cache.put(key, hit)
+    samples.append(hit)
+  samples = np.array(samples)
+  return [intervals(s) for s in samples], np.nanmean(samples, axis=0)
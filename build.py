@@ -0,0 +1,80 @@
+"""
+Dependency tracking for the files paper.py generates.
+
+Every artifact (each figure, and paper.tex itself) is recorded in a manifest
+next to the crunched files along with a digest of what it was built from.
+An artifact whose file exists and whose inputs digest the same as last time
+is fresh and is not regenerated. Fits are tracked the same way by fitcache.py.
+"""
+
+import hashlib
+import inspect
+import os
+import sys
+
+import numpy as np
+import rapidjson as json
+
+import tracing
+
+def digest(*parts):
+  """ Digest of some inputs; arrays by content, everything else by repr """
+  h = hashlib.sha256()
+  for part in parts:
+    if isinstance(part, np.ndarray):
+      h.update(part.tobytes())
+    else:
+      h.update(repr(part).encode())
+    h.update(b"|")
+  return h.hexdigest()
+
+def source_digest(*objs):
+  """ Digest of the source of some modules or functions """
+  return digest(*(inspect.getsource(obj) for obj in objs))
+
+def code_digest():
+  """ Digest of the source of every module loaded from this directory """
+  here = os.path.dirname(os.path.abspath(__file__))
+  filelocs = sorted(
+    os.path.abspath(module.__file__) for module in list(sys.modules.values())
+    if getattr(module, "__file__", None) and os.path.dirname(os.path.abspath(module.__file__)) == here
+  )
+  h = hashlib.sha256()
+  for fileloc in filelocs:
+    with open(fileloc, "rb") as f:
+      h.update(f.read())
+  return h.hexdigest()
+
+class Manifest:
+  def __init__(self, fileloc):
+    self.fileloc = fileloc
+    self.entries = {}
+    if os.path.isfile(fileloc):
+      with open(fileloc) as f:
+        self.entries = json.load(f)
+    self.used = {}
+
+  def fresh(self, fileloc, inputs):
+    """ Was fileloc built from inputs (a digest), and is it still there? """
+    if self.entries.get(fileloc) == inputs and os.path.isfile(fileloc):
+      self.used[fileloc] = inputs
+      return True
+    return False
+
+  def record(self, fileloc, inputs):
+    self.used[fileloc] = inputs
+
+  def clean(self, fileloc, inputs):
+    """ Is fileloc fresh, along with everything recorded alongside it? """
+    return self.entries.get(fileloc) == inputs and all(map(os.path.isfile, self.entries))
+
+  def save(self):
+    """
+    Write out the artifacts checked or built since loading, along with those
+    recorded before that this build did not look at (e.g. figures, with
+    --min) whose files are still there.
+    """
+    entries = {fileloc: inputs for fileloc, inputs in self.entries.items() if os.path.isfile(fileloc)}
+    with open(self.fileloc, "w") as f:
+      json.dump({**entries, **self.used}, f)
+    tracing.count("bytes written", os.path.getsize(self.fileloc))
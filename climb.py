@@ -0,0 +1,135 @@
+"""
+Usage:
+  climb <n> <k> [--steps=<s>] [--restarts=<r>] [--seed=<s>] [--witnesses=<d>]
+
+Options:
+  -h --help        Show help
+  --steps=<s>      Flips per restart [default: 200000]
+  --restarts=<r>   Number of restarts [default: 10]
+  --seed=<s>       Seed for the random generator
+  --witnesses=<d>  Archive of colorings without a MAS(k) to start from and
+                   add to [default: witnesses]
+
+Local search for a 2-coloring of size n without a MAS(k), the hill climbing
+from compass.txt. Any coloring found proves W(2, k) > n.
+
+Rather than recounting every progression after each change as `masCount`
+does, `Conflicts` keeps the number of 1s in every progression and the number
+of monochromatic progressions through every position, so that flipping a
+position only touches the progressions through it. On top of that runs
+simulated annealing with a short tabu list, restarting from scratch after a
+fixed number of flips. The first run starts from the largest archived
+coloring without a MAS(k) of size at most n, padded out at random.
+"""
+
+import numpy as np
+
+def all_progressions(n, k):
+  """ (P, k) array of the positions of every arithmetic progression of length k """
+  if k == 1:
+    return np.arange(n)[:, None]
+  rows = []
+  for step in range(1, (n - 1) // (k - 1) + 1):
+    starts = np.arange(n - (k - 1) * step)
+    rows.append(starts[:, None] + step * np.arange(k))
+  return np.concatenate(rows) if rows else np.empty((0, k), dtype=np.int64)
+
+class Conflicts:
+  """ Monochromatic progression bookkeeping for one coloring """
+
+  def __init__(self, colors, k, progs=None):
+    self.colors = np.asarray(colors, dtype=np.int64).copy()
+    self.k = k
+    self.progs = all_progressions(len(colors), k) if progs is None else progs
+
+    # Which progressions go through each position, as a CSR index
+    positions = self.progs.ravel()
+    order = np.argsort(positions, kind="stable")
+    self.through = order // k
+    self.bounds = np.searchsorted(positions[order], np.arange(len(colors) + 1))
+
+    self.ones = self.colors[self.progs].sum(axis=1)
+    self.mono = (self.ones == 0) | (self.ones == k)
+    self.per_pos = np.bincount(self.progs[self.mono].ravel(), minlength=len(colors))
+    self.total = int(self.mono.sum())
+
+  def progressions_through(self, p):
+    return self.through[self.bounds[p]:self.bounds[p + 1]]
+
+  def delta(self, p):
+    """ Change in the number of monochromatic progressions if p were flipped """
+    ids = self.progressions_through(p)
+    ones = self.ones[ids] + (1 - 2 * self.colors[p])
+    return int(((ones == 0) | (ones == self.k)).sum() - self.mono[ids].sum())
+
+  def flip(self, p):
+    ids = self.progressions_through(p)
+    self.ones[ids] += 1 - 2 * self.colors[p]
+    self.colors[p] ^= 1
+    mono = (self.ones[ids] == 0) | (self.ones[ids] == self.k)
+    gained, lost = ids[mono & ~self.mono[ids]], ids[~mono & self.mono[ids]]
+    self.mono[ids] = mono
+    np.add.at(self.per_pos, self.progs[gained].ravel(), 1)
+    np.add.at(self.per_pos, self.progs[lost].ravel(), -1)
+    self.total += len(gained) - len(lost)
+
+def anneal(n, k, rng=None, steps=200000, restarts=10, start=None, t0=2.0, t1=.05, tenure=None, sample=8):
+  """
+  Search for a coloring of size n without a MAS(k), as an array of 0s and
+  1s, or None if none was found. `start` seeds the first run.
+  """
+  rng = rng or np.random.default_rng()
+  progs = all_progressions(n, k)
+  tenure = tenure or max(2, n // 10)
+  cooling = (t1 / t0) ** (1 / steps)
+
+  for restart in range(restarts):
+    colors = start if restart == 0 and start is not None else rng.integers(0, 2, n)
+    conflicts = Conflicts(colors, k, progs)
+    tabu = np.full(n, -tenure)
+    temperature = t0
+
+    for step in range(steps):
+      if conflicts.total == 0:
+        return conflicts.colors
+      # Only positions in a monochromatic progression are worth flipping
+      candidates = np.flatnonzero(conflicts.per_pos)
+      allowed = candidates[tabu[candidates] + tenure <= step]
+      if not len(allowed):
+        allowed = candidates
+      picks = rng.choice(allowed, size=min(sample, len(allowed)), replace=False)
+      deltas = [conflicts.delta(p) for p in picks]
+      i = int(np.argmin(deltas))
+      p, delta = picks[i], deltas[i]
+
+      if delta <= 0 or rng.random() < np.exp(-delta / temperature):
+        conflicts.flip(p)
+        tabu[p] = step
+      temperature *= cooling
+
+  return None
+
+if __name__ == "__main__":
+  from docopt import docopt
+  from mas import pack, unpack
+  from witnesses import Archive
+
+  clargs = docopt(__doc__)
+  n, k = int(clargs["<n>"]), int(clargs["<k>"])
+  seed = clargs["--seed"]
+  rng = np.random.default_rng(None if seed is None else int(seed))
+  archive = Archive(clargs["--witnesses"])
+
+  start = None
+  nearest = archive.nearest(2, n, k)
+  if nearest is not None:
+    m, row = nearest
+    start = np.concatenate([unpack(row, m), rng.integers(0, 2, n - m)])
+
+  colors = anneal(n, k, rng, int(clargs["--steps"]), int(clargs["--restarts"]), start)
+  if colors is None:
+    print(f"No coloring of size {n} without a MAS({k}) found.")
+  else:
+    archive.add(2, n, k, pack(colors))
+    print("".join(map(str, colors)))
+    print(f"W(2, {k}) > {n}")
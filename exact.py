@@ -0,0 +1,152 @@
+"""
+Usage:
+  exact <k> [--from=<n>] [--to=<n>] [--workers=<w>] [--db=<f>]
+
+Options:
+  -h --help      Show help
+  --from=<n>     First n to count [default: 1]
+  --to=<n>       Last n to count (default: until no coloring is MAS-free)
+  --workers=<w>  Number of worker processes (default: one per core)
+  --db=<f>       Database to memoize counts in [default: data.db]
+
+Exact zeta(2, n, k), by counting the 2-colorings of size n without a MAS(k).
+
+Colorings are built by depth-first search from the middle outwards, placing
+the two positions mirroring each other at every step, and a branch is cut as
+soon as it completes a monochromatic progression. The placed positions are
+always one contiguous block, so branches are cut as early as they would be
+going left to right. A progression is checked exactly once, at the step that
+places the last of its positions.
+
+Color-swap and reversal symmetry are divided out: the first position placed
+is always colored 0, and of each coloring x and its mirror image t(x) (x
+reversed, and color-swapped where needed for t(x) to also have that 0) only
+the smaller is searched, comparing pairs from the middle outwards so that
+which is smaller is known as soon as they first differ. Top-level subtrees
+are counted in parallel.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+# The innermost pair decides which mirror image t is: plain reversal when
+# both its positions are 0, reversal plus color swap when the right one is 1
+REVERSE, REVERSE_SWAP = 0, 1
+
+def pair(n, step):
+  """ The positions placed at some step; the same position twice for the middle of an odd n """
+  return (n - 1) // 2 - step, n // 2 + step
+
+@lru_cache(maxsize=None)
+def progressions(n, k):
+  """ For each step, bitmasks of the progressions of length k completed by it """
+  steps = [[] for _ in range((n + 1) // 2)]
+  lo, hi = pair(n, 0)
+  for step_size in range(1, (n - 1) // (k - 1) + 1 if k > 1 else 2):
+    for start in range(0, n - (k - 1) * step_size):
+      positions = [start + i * step_size for i in range(k)]
+      mask = sum(1 << p for p in positions)
+      steps[max(max(lo - p, p - hi) for p in positions)].append(mask)
+  return steps
+
+def mas_free(ones, masks):
+  """ Are none of the (fully placed) progressions monochromatic? """
+  for mask in masks:
+    hit = ones & mask
+    if hit == 0 or hit == mask:
+      return False
+  return True
+
+def choices(mode, tied):
+  """
+  (left, right, still tied) for the colors of the next pair. While x and
+  t(x) agree so far, only choices keeping x <= t(x) are allowed.
+  """
+  for a, b in ((0, 0), (0, 1), (1, 0), (1, 1)):
+    if not tied:
+      yield a, b, False
+    elif mode == REVERSE:
+      # t maps (a, b) to (b, a): fixed when a == b, else need (0, 1)
+      if a == b or a < b:
+        yield a, b, a == b
+    else:
+      # t maps (a, b) to (1-b, 1-a): fixed when a != b, else need (0, 0)
+      if a != b or a == 0:
+        yield a, b, a != b
+
+def place(n, step, ones, a, b):
+  left, right = pair(n, step)
+  return ones | (a << left) | (b << right)
+
+def count_from(n, k, step, ones, mode, tied):
+  """ Weighted count of the MAS(k)-free completions of a partial coloring """
+  if step == (n + 1) // 2:
+    # Each canonical coloring stands for itself, its swap, and, unless
+    # fixed by t, its mirror image and that one's swap
+    return 2 if tied else 4
+  masks = progressions(n, k)[step]
+  total = 0
+  for a, b, still_tied in choices(mode, tied):
+    placed = place(n, step, ones, a, b)
+    if mas_free(placed, masks):
+      total += count_from(n, k, step + 1, placed, mode, still_tied)
+  return total
+
+def subtrees(n, k, depth):
+  """ Partial colorings (step, ones, mode, tied) to count independently """
+  frontier = []
+  # The innermost left position is always 0, and the right one picks the
+  # mirror image. The middle of an odd n is its own mirror, so t is reversal
+  for b, mode in ((0, REVERSE), (1, REVERSE_SWAP))[:2 if n % 2 == 0 else 1]:
+    ones = place(n, 0, 0, 0, b)
+    if mas_free(ones, progressions(n, k)[0]):
+      frontier.append((1, ones, mode, True))
+
+  while frontier and frontier[0][0] < min(depth, (n + 1) // 2):
+    step, ones, mode, tied = frontier.pop(0)
+    masks = progressions(n, k)[step]
+    for a, b, still_tied in choices(mode, tied):
+      placed = place(n, step, ones, a, b)
+      if mas_free(placed, masks):
+        frontier.append((step + 1, placed, mode, still_tied))
+  return frontier
+
+def count_job(n, k, step, ones, mode, tied):
+  return count_from(n, k, step, ones, mode, tied)
+
+def count_mas_free(n, k, pool=None, depth=6):
+  """ Number of 2-colorings of size n without a MAS(k) """
+  if n == 0:
+    return 1
+  jobs = subtrees(n, k, depth)
+  if pool is None:
+    return sum(count_job(n, k, *job) for job in jobs)
+  return sum(pool.map(count_job, *zip(*((n, k, *job) for job in jobs))))
+
+def exact_zeta(n, k, pool=None):
+  return 1 - count_mas_free(n, k, pool) / 2 ** n
+
+if __name__ == "__main__":
+  from docopt import docopt
+  from store import open_db, exact_counts, record_exact
+
+  clargs = docopt(__doc__)
+  k = int(clargs["<k>"])
+  n = int(clargs["--from"])
+  to = clargs["--to"] and int(clargs["--to"])
+  conn = open_db(clargs["--db"])
+  known = exact_counts(conn, 2, k)
+
+  with ProcessPoolExecutor(int(clargs["--workers"] or os.cpu_count())) as pool:
+    while to is None or n <= to:
+      count = known.get(n)
+      if count is None:
+        count = count_mas_free(n, k, pool)
+        with conn:
+          record_exact(conn, [(2, n, k, count)])
+      print(f"[c=2] [n={n}] [k={k}] :: {count} MAS-free, zeta = {1 - count / 2 ** n}")
+      if count == 0:
+        print(f"W(2, {k}) = {n}")
+        break
+      n += 1
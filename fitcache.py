@@ -0,0 +1,130 @@
+"""
+Persistent cache for curve fits.
+
+A fit is keyed by the content it depends on: the model function's source,
+the data it is fitted to, and the initial guess p0 the caller asked for.
+Rebuilding the paper then only refits the attempts values whose rows changed.
+
+A fit may also be warm-started from a `seed`, e.g. the converged parameters
+of a neighbouring attempts value. That can land in another minimum than the
+fit from p0, so a seeded fit is keyed by its seed as well, and a cached fit
+only ever depends on its key. The seeds tried are listed under the key of the
+fit from p0, so a rebuild can find every seeded fit of the same data.
+"""
+
+import hashlib
+import inspect
+import os
+from functools import lru_cache
+
+import numpy as np
+import rapidjson as json
+
+import tracing
+
+MAXFEV = 1000000
+
+@lru_cache(maxsize=None)
+def source(func):
+  return inspect.getsource(func).encode()
+
+def fit_key(func, xs, ys, p0, seed=None):
+  h = hashlib.sha256()
+  h.update(source(func))
+  for arr in (xs, ys, p0) if seed is None else (xs, ys, p0, seed):
+    h.update(np.asarray(arr, dtype=np.float64).tobytes())
+    h.update(b"|")
+  return h.hexdigest()
+
+def residual(func, xs, ys, params):
+  return float(np.sum((func(np.asarray(xs), *params) - ys) ** 2))
+
+def explains(func, xs, ys, params):
+  """ Does a fit explain at least half the variance of the data? """
+  return residual(func, xs, ys, params) <= np.var(ys) * len(ys) / 2
+
+def fit_once(func, xs, ys, p0):
+  """ `curve_fit(...)[0]`, counting the function evaluations it took """
+  # scipy is only imported once something actually needs fitting
+  from scipy.optimize import curve_fit
+  try:
+    params, _, info, _, _ = curve_fit(func, xs, ys, p0=p0, maxfev=MAXFEV, full_output=True)
+  except RuntimeError:
+    tracing.count("fit evaluations", MAXFEV)
+    raise
+  tracing.count("fit evaluations", int(info["nfev"]))
+  return params
+
+def run_fit(func, xs, ys, p0, seed=None, fallback=True):
+  """
+  `curve_fit` from the seed if there is one, else from p0. A seed can lead
+  into a poor local minimum its neighbour was stuck in, so if the seeded fit
+  does not explain the data, the fit from p0 is tried as well (unless not
+  `fallback`, in which case None is returned if the seeded fit fails).
+  """
+  seeded = None
+  if seed is not None:
+    try:
+      seeded = fit_once(func, xs, ys, seed)
+    except RuntimeError:
+      pass
+    if not fallback or (seeded is not None and explains(func, xs, ys, seeded)):
+      return seeded
+
+  try:
+    params = fit_once(func, xs, ys, p0)
+  except RuntimeError:
+    if seeded is None:
+      raise
+    return seeded
+  if seeded is not None and residual(func, xs, ys, seeded) < residual(func, xs, ys, params):
+    return seeded
+  return params
+
+class FitCache:
+  def __init__(self, fileloc):
+    self.fileloc = fileloc
+    self.entries = {}
+    if os.path.isfile(fileloc):
+      with open(fileloc) as f:
+        self.entries = json.load(f)
+    self.used = set()
+
+  def get(self, key):
+    if key in self.entries:
+      self.used.add(key)
+      return np.array(self.entries[key])
+    return None
+
+  def put(self, key, params):
+    self.used.add(key)
+    self.entries[key] = [float(p) for p in params]
+
+  def seeds(self, key):
+    """ The seeds the fit under `key` has been warm-started from, in order """
+    key = "seeds:" + key
+    if key not in self.entries:
+      return []
+    self.used.add(key)
+    return [np.array(seed) for seed in self.entries[key]]
+
+  def add_seed(self, key, seed):
+    """ Remember that the fit under `key` has been warm-started from `seed` """
+    key = "seeds:" + key
+    self.used.add(key)
+    self.entries.setdefault(key, []).append([float(p) for p in seed])
+
+  def fit(self, func, xs, ys, p0):
+    """ Like `curve_fit(func, xs, ys, p0)[0]`, but cached """
+    key = fit_key(func, xs, ys, p0)
+    params = self.get(key)
+    if params is None:
+      params = run_fit(func, xs, ys, p0)
+      self.put(key, params)
+    return params
+
+  def save(self):
+    """ Write out the entries used since loading; the rest are stale """
+    with open(self.fileloc, "w") as f:
+      json.dump({key: self.entries[key] for key in sorted(self.used)}, f)
+    tracing.count("bytes written", os.path.getsize(self.fileloc))
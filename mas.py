@@ -0,0 +1,147 @@
+"""
+Usage:
+  mas <n> <k> [--attempts=<a>] [--seed=<s>]
+
+Options:
+  -h --help       Show help
+  --attempts=<a>  Number of colorings to generate [default: 1000000]
+  --seed=<s>      Seed for the random generator
+
+Batched search for MAS(k)s in random 2-colorings, mirroring
+`generateSuccessCount` and `hasMAS` from algo.nim.
+
+Colorings are packed into rows of uint64s exactly like `TwoColoring.data`:
+the LEAST SIGNIFICANT bit of the first word is the first position. Bits
+past the end of a coloring are always kept at 0.
+"""
+
+import numpy as np
+
+WORD = 64
+ALL = np.uint64(2**64 - 1)
+
+def word_count(n):
+  """ Number of uint64s needed to hold a coloring of size n """
+  return -(-n // WORD)
+
+def valid_mask(n, words):
+  """ Packed row with the first n positions set """
+  mask = np.zeros(words, dtype=np.uint64)
+  full, rest = divmod(max(n, 0), WORD)
+  mask[:full] = ALL
+  if rest:
+    mask[full] = np.uint64((1 << rest) - 1)
+  return mask
+
+def random_colorings(rng, count, n):
+  """ Generate `count` random 2-colorings of size n as packed rows """
+  words = word_count(n)
+  cols = rng.integers(0, 2**64, size=(count, words), dtype=np.uint64, endpoint=False)
+  return cols & valid_mask(n, words)
+
+def shift(cols, s):
+  """ Move position i + s of every row to position i; like `shiftRight` but the other way """
+  q, r = divmod(s, WORD)
+  words = cols.shape[1]
+  result = np.zeros_like(cols)
+  if q >= words:
+    return result
+  result[:, :words - q] = cols[:, q:] >> np.uint64(r)
+  if r:
+    result[:, :words - q - 1] |= cols[:, q + 1:] << np.uint64(WORD - r)
+  return result
+
+def progression_starts(cols, step, k):
+  """
+  Set bit i of each row iff positions i, i + step, ..., i + (k-1) * step
+  are all set in that row. Takes O(log k) shifts by doubling the run.
+  """
+  run = cols
+  length = 1
+  while length * 2 <= k:
+    run = run & shift(run, length * step)
+    length *= 2
+  if length < k:
+    # Overlapping the two halves is fine since AND is idempotent
+    run = run & shift(run, (k - length) * step)
+  return run
+
+def has_mas(cols, n, k):
+  """ For each packed coloring of size n, does it contain a MAS(k)? """
+  count, words = cols.shape
+  if k == 1:
+    return np.full(count, n >= 1)
+
+  # Search for monochromatic 1s and 0s at once by stacking the complements
+  # under the colorings; row i and row i + count belong to the same coloring
+  valid = valid_mask(n, words)
+  both = np.concatenate([cols, ~cols & valid])
+  found = np.zeros(count, dtype=bool)
+  active = np.arange(count)
+
+  for step in range(1, (n - 1) // (k - 1) + 1):
+    starts = valid_mask(n - (k - 1) * step, words)
+    hits = (progression_starts(both, step, k) & starts).any(axis=1)
+    hits = hits[:len(active)] | hits[len(active):]
+    found[active[hits]] = True
+
+    # Rows with a MAS already are done; stop shifting them
+    if hits.any():
+      keep = ~hits
+      active = active[keep]
+      both = both[np.concatenate([keep, keep])]
+      if not len(active):
+        break
+
+  return found
+
+def generate_success_count(c, n, k, attempts, rng=None, batch=1 << 16):
+  """ Approximates attempts * zeta_attempts(c, n, k); see algo.nim """
+  assert c == 2
+  rng = rng or np.random.default_rng()
+  successes = 0
+  remaining = attempts
+  while remaining > 0:
+    size = min(batch, remaining)
+    successes += int(has_mas(random_colorings(rng, size, n), n, k).sum())
+    remaining -= size
+  return successes
+
+def from_string(s):
+  """ Pack a coloring written as a string of 0s and 1s into a single row """
+  row = np.zeros(word_count(len(s)), dtype=np.uint64)
+  for i, car in enumerate(s):
+    if car == "1":
+      row[i // WORD] |= np.uint64(1 << (i % WORD))
+  return row
+
+def to_string(row, n):
+  """ Inverse of `from_string`; same output as `$` on a TwoColoring """
+  return "".join(str(int(row[i // WORD] >> np.uint64(i % WORD)) & 1) for i in range(n))
+
+def pack(colors):
+  """ Pack an array of 0s and 1s into a single row, like `from_string` """
+  n = len(colors)
+  bits = np.zeros(word_count(n) * WORD, dtype=np.uint8)
+  bits[:n] = colors
+  return np.packbits(bits, bitorder="little").view("<u8").astype(np.uint64)
+
+def unpack(row, n):
+  """ Inverse of `pack` """
+  return np.unpackbits(np.asarray(row, dtype="<u8").view(np.uint8), bitorder="little")[:n]
+
+if __name__ == "__main__":
+  from docopt import docopt
+  from time import time
+
+  clargs = docopt(__doc__)
+  n, k = int(clargs["<n>"]), int(clargs["<k>"])
+  attempts = int(clargs["--attempts"])
+  seed = clargs["--seed"]
+  rng = np.random.default_rng(None if seed is None else int(seed))
+
+  t0 = time()
+  successes = generate_success_count(2, n, k, attempts, rng)
+  duration = time() - t0
+  print(f"[c=2] [n={n}] [k={k}] [a={attempts}] :: {successes / attempts * 100:.1f}% ({successes})")
+  print(f"{attempts / duration:.0f} colorings/s")
@@ -0,0 +1,26 @@
+"""
+Curves fitted to the trial data. These live outside paper.py so that worker
+processes can fit them without importing the paper script.
+"""
+
+import numpy as np
+
+# Define fitting curves
+def exponential(x, y0, A, q, x0):
+  return y0 + A * np.exp(q * (x - x0))
+def logistic(x, y0, A, q, x0):
+  return y0 + A / (1 + np.exp(-q * (x - x0)))
+def monomial(x, y0, A, q, x0):
+  return y0 + A * np.power(x - x0, q)
+def logarithmic(x, y0, A, q, x0):
+  return y0 + A * np.log(q * (x - x0))
+def linear(x, y_0, A):
+  return y_0 + A * x
+def reciprocal(x, y0, A):
+  return y0 + A / x
+def arctan(x, y0, A, q, x0):
+  return y0 + A * np.arctan(q * (x - x0))
+def tanh(x, y0, A, q, x0):
+  return y0 + A * np.tanh(q * (x - x0))
+def reciprocalSq(x, y0, A):
+  return y0 + A / x**2
@@ -1,161 +1,125 @@
 """
 Usage:
-  paper [--ex] [--min] [--nofun]
+  paper [--ex] [--min] [--nofun] [--force] [--profile]
 
 Options:
   -h --help    Show help
   --ex         Use existing files
-  --min        Do not generate graphs
+  --min        Do not generate graphs; once everything has been fitted, this
+               only writes paper.tex, without loading scipy or matplotlib
   --nofun      Remove iffy stuff (for Regeneron STS)
+  --force      Rebuild everything, even what is up to date
+  --profile    Profile the build with cProfile, into crunched/paper.prof
+
+Every build also writes a trace of how long each stage took to
+paper.trace.json, which chrome://tracing or Perfetto can open.
 """
 
 import os
+import sys
 import rapidjson as json
-from scipy.optimize import curve_fit
 import numpy as np
 import math
-import matplotlib.pyplot as plt
-import matplotlib
 from docopt import docopt
 from operator import itemgetter
 import inspect
 from statistics import mean
 from time import sleep
 from functools import partial
-import sqlite3 as s3
+from collections import Counter
+
+import snapshot
+import render
+import build
+import zeta
+import tracing
+import templates
+import selection
+import bootstrap
+from fitcache import FitCache
+from models import exponential
 
 clargs = docopt(__doc__)
 
+if clargs["--profile"]:
+  import cProfile
+  profiler = cProfile.Profile()
+  profiler.enable()
+
 def unzip(n, l):
   return tuple(map(list, zip(*l))) or tuple([] for _ in range(n))
 
-# Make matplotlib faster
-matplotlib.use('TkAgg')
-
-conn = s3.connect("data.db")
-db = conn.cursor()
-
-db.execute("CREATE INDEX IF NOT EXISTS ka_index ON data (k, attempts)")
-db.execute("CREATE INDEX IF NOT EXISTS na_index ON data (n, attempts)")
-
-if clargs["--ex"] or clargs["--min"]:
-  # Make breaking changes such that DB execution almost always returns
-  # trash, and file saving is a noop
-
-  class PlotDummy():
-    def __getattr__(self, *args, **kwargs):
-      return lambda *args, **kwargs: (None, None)
-  plt = PlotDummy()
-
-  actual_db = db
-  class DBDummy():
-    def execute(self, sql, *args, **kwargs):
-      # Still need to be able to get these lists
-      if not clargs["--min"] and sql.startswith("SELECT DISTINCT"):
-        return actual_db.execute(sql, *args, **kwargs)
-      else:
-        return actual_db.execute("SELECT * FROM data WHERE 1=0")
-  db = DBDummy()
-
 target_dir = "crunched/"
 
 if not os.path.isdir(target_dir):
   os.makedirs(target_dir)
 
-# Output to the LaTeX file
-output_parts = []
+with tracing.span("snapshot"):
+  snap = snapshot.load("data.db", os.path.join(target_dir, "data.npz"))
+
 paper_fileloc = "paper.tex"
 
-# Define fitting curves
-def exponential(x, y0, A, q, x0):
-  return y0 + A * np.exp(q * (x - x0))
-def logistic(x, y0, A, q, x0):
-  return y0 + A / (1 + np.exp(-q * (x - x0)))
-def monomial(x, y0, A, q, x0):
-  return y0 + A * np.power(x - x0, q)
-def logarithmic(x, y0, A, q, x0):
-  return y0 + A * np.log(q * (x - x0))
-def linear(x, y_0, A):
-  return y_0 + A * x
-def reciprocal(x, y0, A):
-  return y0 + A / x
-def arctan(x, y0, A, q, x0):
-  return y0 + A * np.arctan(q * (x - x0))
-def tanh(x, y0, A, q, x0):
-  return y0 + A * np.tanh(q * (x - x0))
-def reciprocalSq(x, y0, A):
-  return y0 + A / x**2
+# paper.tex depends on nothing but the code, the data, and the flags
+manifest = build.Manifest(os.path.join(target_dir, "manifest.json"))
+# --force and --profile change how the paper is built, not what it says
+paper_inputs = build.digest(build.code_digest(), snap.stamp, sorted(
+  (flag, value) for flag, value in clargs.items() if flag not in ("--force", "--profile")
+))
+if not clargs["--force"]:
+  if manifest.clean(paper_fileloc, paper_inputs):
+    print(f"{paper_fileloc} is up to date.")
+    sys.exit()
+else:
+  manifest.entries = {}
+
+# Output to the LaTeX file, section by section as it is rendered
+out = templates.Writer(paper_fileloc)
+
+# With existing files, or without graphs, only fit
+draw = not (clargs["--ex"] or clargs["--min"])
+pool = render.pool()
 
 def appx_zeta(n, k):
-  """ zeta approximation derived deductively """
-  c = 2.0
-  p_AS_is_MAS = c ** (1-k)
-  n_COL = c ** n
-  epsilon = 0
-  #epsilon = (k-2)/(k-1) * (n-k+1)
-  n_AS_per_COL = (n**2 - n) / (2*(k-1)) + (2-k)/2 - epsilon
-  v = 1.0 - (1.0 - p_AS_is_MAS) ** (n_COL * n_AS_per_COL)
-  return v
+  """ zeta approximation derived deductively; see zeta.py """
+  return zeta.appx_zeta(n, k)
 
 def appx_zeta_adj(n, k, attempts):
   """ round the zeta appx'n to be able to hit 1 and 0, "within one coloring" """
   #return np.round(appx_zeta(n, k) * attempts) / attempts
   return appx_zeta(n, k)
 
-def specify(template, **context):
-  context = context or globals()
-  s = 'f"""' + (template
-    .replace("{", "{{")
-    .replace("}", "}}")
-    .replace("\\", "\\\\")
-    .replace("[[", "{")
-    .replace("]]", "}") ) + '"""'
-  return eval(s, context)
-
-def echo(s):
-  output_parts.append(specify(s))
-
-def fit(xs, ys, func, p0, bounds=None, **kwargs):
-  """ Fit a curve over some xs and ys and plot it, returning fit params """
-  params, covariance = curve_fit(func, xs, ys, p0=p0, maxfev=1000000)
-  bounds = bounds or (min(xs), max(xs))
-  sample_xs = np.linspace(*bounds, 200)
-  plt.plot(sample_xs, func(sample_xs, *params), **kwargs)
-  return params
-
-bold = {'c': 'r', 's': 30}
-small = {'s': 4}
-
-def graph(xs, ys, x_label, y_label, *, title=None, filename=None, fit_to=None, style={}, keep=False):
-  fileloc = os.path.join(target_dir, filename or f"{x_label}-{y_label}{'-fitted' if fit_to else ''}.png")
-
-  plt.suptitle(title or f"{x_label} vs {y_label}")
-  plt.xlabel(x_label)
-  plt.ylabel(y_label)
-
-  plt.scatter(xs, ys, **style)
-  params = None
-  if fit_to and len(xs) > len(fit_to[1]):
-    params = fit(xs, ys, *fit_to)
-  print(f"Generated {fileloc}.")
-  plt.savefig(fileloc)
-  if not keep:
-    plt.clf()
-
-  if fit_to:
-    return fileloc, params
-  return fileloc
+def echo(template, **context):
+  """ Render a template with the given names and write it out """
+  with tracing.span("specify"):
+    out.write(templates.specify(template, context))
+
+fits = FitCache(os.path.join(target_dir, "fits.json"))
+replicates = bootstrap.SampleCache(os.path.join(target_dir, "bootstrap.npz"))
 
 def img_latex(fileloc):
-  return specify(r"\includegraphics[width=2.6in]{[[ fileloc ]]}", fileloc=fileloc)
+  return templates.specify(r"\includegraphics[width=2.6in]{[[ fileloc ]]}", {"fileloc": fileloc})
+
+def grid_latex(filelocs, caption):
+  """ Figures of two images each, side by side; the last one gets the caption """
+  pairs = [filelocs[i:i + 2] for i in range(0, len(filelocs), 2)] or [[]]
+  return templates.each(
+    r"\begin{figure}[H] \centering [[ images ]] [[ caption if last else '' ]] \end{figure}",
+    ({"images": " ".join(map(img_latex, pair)), "caption": caption, "last": i == len(pairs) - 1}
+     for i, pair in enumerate(pairs)),
+    "\n",
+  )
 
-def params_latex(f, params):
-  param_names = inspect.getargspec(f)[0][1:]
+def params_latex(f, params, intervals=None):
+  param_names = list(inspect.signature(f).parameters)[1:]
 
   result = r"\begin{tabular}{c|l}"
   lines = []
-  for pname, param in zip(param_names, params):
-    lines.append(f"${pname}$ & ${param}$")
+  for i, (pname, param) in enumerate(zip(param_names, params)):
+    if intervals is None:
+      lines.append(f"${pname}$ & ${param}$")
+    else:
+      lo, hi = intervals[i]
+      lines.append(f"${pname}$ & ${param}$ $[{lo}, {hi}]$")
   result += r"\\".join(lines)
   result += r"\end{tabular}"
 
@@ -417,72 +381,79 @@ def take_while(pred, seq):
   del seq[:i]
   return result
 
-As = list(map(itemgetter(0), db.execute("SELECT DISTINCT attempts FROM data ORDER BY attempts")))
+As = snap.As
 
-png_locs = []
-paramss = []
-for a in As:
-  xs, ys = unzip(2, db.execute("SELECT k, n FROM data WHERE attempts=?", (a,)))
+with tracing.span("k vs V fits and plots"):
+  png_locs, paramss = render.kv_plots(pool, snap, fits, exponential, [0, 1, .5, 0], target_dir, manifest, draw)
 
-  plt.suptitle(f"k vs V (a={a})")
-  plt.xlabel("k")
-  plt.ylabel("V")
-  plt.scatter(xs, ys)
-  params = fit(xs, ys, exponential, p0=[0, 1, .5, 0])
-  paramss.append(params)
+out.write(grid_latex(png_locs, r"\caption{$k$ vs $V$ curves for fixed values of $a$, with an exponential fit.} \label{fig:v}"))
 
-  filename = f"k-v-{a}.png"
-  fileloc = os.path.join(target_dir, filename)
-  plt.savefig(fileloc)
-  print(f"{fileloc} generated.")
-  png_locs.append(fileloc)
-
-  plt.clf()
-
-echo(r"\begin{figure}[H] \centering")
-for i, loc in enumerate(png_locs):
-  if i % 2 == 0:
-    echo(r"\end{figure} \begin{figure}[H] \centering")
-  echo(img_latex(loc))
-echo(r"\caption{$k$ vs $V$ curves for fixed values of $a$, with an exponential fit.} \label{fig:v} \end{figure}")
+# Resampling the rows of each a shows how much each fit could be trusted
+with tracing.span("bootstrap"):
+  param_intervals, mean_replicates = bootstrap.bootstrap_all(pool, [snap.group(a) for a in As], replicates, exponential, [0, 1, .5, 0], paramss)
 
 echo(r"""
-The found values of $y_0$, $A$, $q$, and $x_0$ versus $a$ are shown below.
-""")
+The found values of $y_0$, $A$, $q$, and $x_0$ versus $a$ are shown below, each with a 95\% confidence interval from refitting [[replicate_count]] bootstrap resamples of the rows for that $a$.
+""", replicate_count=bootstrap.REPLICATES)
 
 begin_latex = r"\begin{figure}[H] \centering"
 end_latex = r"\end{figure}"
 
 parameter_point_estimates = {}
+parameter_intervals = {}
+param_plots = []
 
-echo(begin_latex)
 for i, param in enumerate(["y_0", "A", "q", "x_0"]):
-  if i != 0 and i % 2 == 0:
-    echo(end_latex)
-    echo(begin_latex)
-
-  plt.suptitle(f"a vs {param}")
-  plt.xlabel("a")
-  plt.ylabel(param)
-
-  filename = f"params-{param}.png"
-  fileloc = os.path.join(target_dir, filename)
-
   xs = As
   ys = list(map(itemgetter(i), paramss))
   parameter_point_estimates[param] = mean(ys)
-  plt.scatter(xs, ys)
+  parameter_intervals[param] = bootstrap.intervals(mean_replicates)[i]
+  los, his = unzip(2, (intervals[i] for intervals in param_intervals))
+
+  filename = f"params-{param}.png"
+  fileloc = os.path.join(target_dir, filename)
+  param_plots.append((xs, ys, los, his, f"a vs {param}", "a", param, fileloc))
 
   #params = fit(xs, ys, linear, [1, 1])
 
-  echo(img_latex(fileloc))
-  #echo(r"\\")
-  #echo(params_latex(exponential, params))
+with tracing.span("parameter plots"):
+  param_filelocs = render.interval_plots(pool, param_plots, manifest, draw)
+out.write(grid_latex(param_filelocs, r"\caption{$a$ versus parameter values for the previous exponential fittings, with 95\% bootstrap confidence intervals.} \label{fig:fit}"))
 
-  print(f"{fileloc} generated.")
-  plt.savefig(fileloc)
-  plt.clf()
-echo(r"\caption{$a$ versus parameter values for the previous exponential fittings.} \label{fig:fit} " + end_latex)
+with tracing.span("overlay plot"):
+  overlay_loc = render.overlay_plot(pool, snap, os.path.join(target_dir, "appx-v.png"), manifest, draw)
+
+echo(r"""
+We may also compare each $V$ to the $n$ at which $\zeta_a$ would most likely first be $1$ if $\zeta$ were exactly the tempting expression from earlier, i.e., the first $n$ for which $\left(1 - (1 - c^{1-k})^{\text{\#AS}/\text{col}}\right)^a \geq \frac{1}{2}$, with the exact $\epsilon$.
+""")
+echo(begin_latex)
+out.write(img_latex(overlay_loc))
+echo(r"\caption{Measured $V$ versus $V$ predicted by the approximation of $\zeta$, for every trial. Color denotes $\log_{10} a$; the line is $y = x$.} \label{fig:appx} " + end_latex)
+
+# Every family fitted to every a, after the exponential fits so those are reused
+with tracing.span("model selection"):
+  rankings = selection.select(pool, [snap.group(a) for a in As], fits)
+with tracing.span("save"):
+  fits.save()
+  replicates.save()
+pool.shutdown()
+
+model_winners = [selection.winners(ranking) for ranking in rankings]
+aic_wins = Counter(aic for aic, bic, rss in model_winners if aic is not None)
+family_names = ", ".join(r"\textit{" + name + "}" for name, func, p0 in selection.FAMILIES)
+top_family, top_wins = (aic_wins.most_common(1) or [("none", 0)])[0]
+
+echo(r"""
+The exponential fit was not the only candidate. We also fit each of the families of curves [[family_names]] to the $k$ vs $V$ data of every $a$, and ranked the fits by the Akaike (AIC) and Bayesian (BIC) information criteria, which penalize the four-parameter families for their extra parameters, and by their residual sum of squares (RSS). By AIC, the [[top_family]] fit is best for [[top_wins]] of the [[len(As)]] values of $a$.
+""", family_names=family_names, top_family=top_family, top_wins=top_wins, As=As)
+echo(r"\begin{figure}[H] \caption{Best family of curves for each $a$ by AIC, BIC, and RSS} \centering \begin{tabular}{c|l|l|l}")
+echo(r"$a$ & AIC & BIC & RSS \\ \hline")
+out.write(templates.each(
+  r"$[[a]]$ & \textit{[[aic]]} & \textit{[[bic]]} & \textit{[[rss]]}",
+  ({"a": a, "aic": aic, "bic": bic, "rss": rss} for a, (aic, bic, rss) in zip(As, model_winners)),
+  " \\\\\n",
+))
+echo(r"\end{tabular} \label{fig:models} \end{figure}")
 
 echo(r"""
 
@@ -501,13 +472,16 @@ The second-best options are to approximate these parameters either with the valu
 
 """)
 
-echo(r"\begin{figure}[H] \caption{Point estimates of parameters to exponential fits of $V$} \centering \begin{tabular}{c|l}")
-echo(" \\\\\n".join(
-  "$" + str(param) + "$ & $" + str(round(est, 3)) + "$" for param, est in parameter_point_estimates.items()
+echo(r"\begin{figure}[H] \caption{Point estimates of parameters to exponential fits of $V$, with 95\% bootstrap confidence intervals} \centering \begin{tabular}{c|l|l}")
+out.write(templates.each(
+  r"$[[param]]$ & $[[round(est, 3)]]$ & $[[[round(lo, 3)]], [[round(hi, 3)]]]$",
+  ({"param": param, "est": est, "lo": parameter_intervals[param][0], "hi": parameter_intervals[param][1]}
+   for param, est in parameter_point_estimates.items()),
+  " \\\\\n",
 ))
 echo(r"\end{tabular} \label{fig:est} \end{figure}")
 
-globals().update(**parameter_point_estimates)
+y_0, A, q, x_0 = (parameter_point_estimates[param] for param in ["y_0", "A", "q", "x_0"])
 def W_est(k):
   return y_0 + A * np.exp(q * (k - x_0))
 
@@ -534,8 +508,18 @@ $k$ & \text{Known value} & \text{Approximation} & \lvert \text{Difference} \rver
 \bibliography{references}
 
 \end{document}
-""")
+""", y_0=y_0, A=A, q=q, x_0=x_0, W_est=W_est)
 
-with open(paper_fileloc, 'w') as f:
-  f.write("\n".join(output_parts))
+with tracing.span("write"):
+  tracing.count("bytes written", out.close())
 print(f"{paper_fileloc} generated.")
+
+manifest.record(paper_fileloc, paper_inputs)
+manifest.save()
+
+tracing.save("paper.trace.json")
+if clargs["--profile"]:
+  import pstats
+  profiler.disable()
+  profiler.dump_stats(os.path.join(target_dir, "paper.prof"))
+  pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
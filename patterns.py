@@ -0,0 +1,100 @@
+"""
+Usage:
+  patterns <mask> <n> [--attempts=<a>] [--unspaced] [--seed=<s>]
+
+Options:
+  -h --help       Show help
+  --attempts=<a>  Number of colorings to generate [default: 100000]
+  --unspaced      Only shift the mask, don't space it out
+  --seed=<s>      Seed for the random generator
+
+Generalized progressions from compass.txt, checked in batches.
+
+A mask spec like `11_1` selects positions a, a+d, a+3d; `_` (or `0`) is a
+gap. With spacing, the mask `111` covers 111, 10101, 1001001, and so on.
+`compile_mask` precompiles every spaced and shifted instance of a mask that
+fits in a coloring of size n into packed rows (the layout of mas.py and
+`TwoColoring.data`), and `contains` tests a whole batch of colorings against
+all of them at once, the vectorized counterpart of calling
+`TwoColoring.homogenous` once per coloring, mask, and shift.
+"""
+
+import numpy as np
+
+from mas import WORD, word_count, random_colorings
+
+class Pattern:
+  """ Every instance of a mask in colorings of size n, as packed rows """
+
+  def __init__(self, spec, n, positions):
+    self.spec, self.n = spec, n
+    self.positions = positions
+    count = len(positions)
+    self.masks = np.zeros((count, word_count(n)), dtype=np.uint64)
+    rows = np.repeat(np.arange(count), positions.shape[1])
+    bits = np.left_shift(np.uint64(1), (positions.ravel() % WORD).astype(np.uint64))
+    np.bitwise_or.at(self.masks, (rows, positions.ravel() // WORD), bits)
+
+  def __len__(self):
+    return len(self.masks)
+
+def offsets(spec):
+  """ Offsets of the selected positions in a mask spec """
+  if set(spec) - set("10_"):
+    raise ValueError(f"Mask spec {spec!r} may only contain 1, 0, and _.")
+  result = np.array([i for i, car in enumerate(spec) if car == "1"])
+  if not len(result):
+    raise ValueError(f"Mask spec {spec!r} selects no positions.")
+  return result
+
+def compile_mask(spec, n, spaced=True, spacings=None):
+  """
+  Precompile a mask spec for colorings of size n. `spacings` overrides the
+  spacings d to use, which default to every d that fits (or just 1 if not
+  `spaced`).
+  """
+  offs = offsets(spec)
+  span = offs[-1]
+  if spacings is None:
+    spacings = range(1, (n - 1) // span + 1 if span else 2) if spaced else [1]
+  rows = []
+  for d in spacings:
+    starts = np.arange(n - span * d)
+    rows.append(starts[:, None] + offs * d)
+  positions = np.concatenate(rows) if rows else np.empty((0, len(offs)), dtype=np.int64)
+  return Pattern(spec, n, positions.astype(np.int64))
+
+def homogeneous(cols, masks):
+  """ (B, M) array of whether each coloring is all one color under each mask """
+  selected = cols[:, None, :] & masks[None, :, :]
+  return (selected == masks).all(axis=2) | (selected == 0).all(axis=2)
+
+def contains(cols, pattern, chunk=1 << 22):
+  """ For each packed coloring, is it homogeneous under any instance of the pattern? """
+  found = np.zeros(len(cols), dtype=bool)
+  active = np.arange(len(cols))
+  words = max(cols.shape[1], 1)
+  step = max(1, chunk // (words * max(len(cols), 1)))
+  for lo in range(0, len(pattern), step):
+    hits = homogeneous(cols[active], pattern.masks[lo:lo + step]).any(axis=1)
+    found[active[hits]] = True
+    active = active[~hits]
+    if not len(active):
+      break
+  return found
+
+if __name__ == "__main__":
+  from docopt import docopt
+
+  clargs = docopt(__doc__)
+  spec, n = clargs["<mask>"], int(clargs["<n>"])
+  attempts = int(clargs["--attempts"])
+  seed = clargs["--seed"]
+  rng = np.random.default_rng(None if seed is None else int(seed))
+
+  pattern = compile_mask(spec, n, not clargs["--unspaced"])
+  successes = 0
+  for lo in range(0, attempts, 1 << 14):
+    cols = random_colorings(rng, min(1 << 14, attempts - lo), n)
+    successes += int(contains(cols, pattern).sum())
+  print(f"[mask={spec}] [n={n}] [a={attempts}] :: {successes / attempts * 100:.1f}% ({successes}) over {len(pattern)} instances")
@@ -0,0 +1,198 @@
+"""
+Headless, parallel rendering of the paper's figures.
+
+Each figure is its own `Figure` on the Agg backend instead of the global
+pyplot state, so no display is needed and figures can be fitted and drawn
+side by side in worker processes. Results always come back in the order the
+figures were asked for, whichever worker finished first.
+
+Figures still fresh in the build manifest (see build.py) are not redrawn.
+"""
+
+import multiprocessing as mp
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import tracing
+from build import digest, source_digest
+from fitcache import fit_key, run_fit, residual, explains
+from zeta import predicted_v
+
+def pool(workers=None):
+  # paper.py is a script without a main guard, so workers must be forked
+  # from it rather than re-import it as the spawn start method would
+  context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+  return ProcessPoolExecutor(workers, mp_context=context)
+
+def figure(title, x_label, y_label):
+  # matplotlib is only imported once a figure is actually drawn
+  from matplotlib.figure import Figure
+  from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+  fig = Figure()
+  FigureCanvasAgg(fig)
+  fig.suptitle(title)
+  ax = fig.add_subplot(1, 1, 1)
+  ax.set_xlabel(x_label)
+  ax.set_ylabel(y_label)
+  return fig, ax
+
+def plot_fit(ax, xs, func, params, bounds=None, **kwargs):
+  bounds = bounds or (min(xs), max(xs))
+  sample_xs = np.linspace(*bounds, 200)
+  ax.plot(sample_xs, func(sample_xs, *params), **kwargs)
+
+def interval_job(xs, ys, los, his, title, x_label, y_label, fileloc):
+  fig, ax = figure(title, x_label, y_label)
+  ys, los, his = map(np.asarray, (ys, los, his))
+  ax.errorbar(xs, ys, yerr=[ys - los, his - ys], fmt="o", capsize=3)
+  fig.savefig(fileloc)
+
+def kv_job(a, xs, ys, func, params, fileloc):
+  fig, ax = figure(f"k vs V (a={a})", "k", "V")
+  ax.scatter(xs, ys)
+  plot_fit(ax, xs, func, params)
+  fig.savefig(fileloc)
+
+# Neighbours a poor fit is retried from, at most
+SEEDS = 4
+
+def fit_all(pool, groups, fits, func, p0, labels=None, job=run_fit):
+  """
+  Fit func to every (xs, ys) group in parallel, reusing cached fits. A group
+  not fitted yet is warm-started from the nearest neighbour with a fit that
+  explains its data, falling back to p0 if that fit does not explain its own,
+  or if no neighbour has a good fit yet, as on a first build; poor fits are
+  then retried from the next nearest good neighbours, up to SEEDS of them in
+  all. Fits go round in waves, so good fits spread as they would if every
+  group were warm-started from the last in turn.
+
+  Every fit is cached under its own inputs, seed included, and a group first
+  takes every fit of its data the cache holds, from p0 and from the seeds
+  tried before, so a rebuild replays the fits of the last one without
+  fitting. `labels` name the groups in the trace, and `job` stands in for
+  `run_fit`, e.g. to turn fits that fail into empty ones. Groups without any
+  fit are left None.
+  """
+  labels = labels or list(range(len(groups)))
+  keys = [fit_key(func, xs, ys, p0) for xs, ys in groups]
+  paramss = [None] * len(groups)
+  goods = [False] * len(groups)
+  # The starts tried per group: None for p0, and the bytes of each seed
+  tried = [set() for _ in groups]
+
+  def take(i, params):
+    # A fit that fails is cached as empty
+    if len(params) and (paramss[i] is None or residual(func, *groups[i], params) < residual(func, *groups[i], paramss[i])):
+      paramss[i] = params
+      goods[i] = explains(func, *groups[i], params)
+
+  def neighbours(i):
+    """ Good neighbours of group i whose fit it has not been seeded from yet, nearest first """
+    for distance in range(1, len(groups)):
+      for j in (i - distance, i + distance):
+        if 0 <= j < len(groups) and goods[j] and paramss[j].tobytes() not in tried[i]:
+          yield j
+
+  # Take whatever the cache holds
+  for i, key in enumerate(keys):
+    for seed in [None] + fits.seeds(key):
+      params = fits.get(key if seed is None else fit_key(func, *groups[i], p0, seed))
+      if params is not None:
+        tried[i].add(None if seed is None else seed.tobytes())
+        take(i, params)
+
+  while True:
+    # Fit the rest: from the nearest good neighbour first, then p0, then
+    # the next nearest good neighbours
+    wave = {}
+    for i in range(len(groups)):
+      if goods[i]:
+        continue
+      nearest = next(neighbours(i), None)
+      if nearest is not None and (None in tried[i] or not tried[i]) and len(tried[i] - {None}) < SEEDS:
+        seed = paramss[nearest]
+        tried[i].add(seed.tobytes())
+        trace_args = {"seeded_from": labels[nearest]}
+      elif None not in tried[i]:
+        seed = None
+        tried[i].add(None)
+        trace_args = {}
+      else:
+        continue
+      wave[i] = (seed, tracing.submit(pool, "fit" if seed is None else "refit", job, func, *groups[i], p0, seed, False, group=labels[i], **trace_args))
+    if not wave:
+      return paramss
+
+    for i, (seed, future) in wave.items():
+      params = future.result()
+      params = np.array([]) if params is None else params
+      if seed is None:
+        fits.put(keys[i], params)
+      else:
+        fits.put(fit_key(func, *groups[i], p0, seed), params)
+        fits.add_seed(keys[i], seed)
+      take(i, params)
+
+def draw_stale(pool, manifest, jobs):
+  """ Run the (fileloc, inputs, job, *args) jobs whose figure is not fresh """
+  futures = [
+    (fileloc, inputs, tracing.submit(pool, "draw", job, *args, fileloc=fileloc))
+    for fileloc, inputs, job, *args in jobs
+    if not manifest.fresh(fileloc, inputs)
+  ]
+  for fileloc, inputs, future in futures:
+    future.result()
+    tracing.count("bytes written", os.path.getsize(fileloc))
+    manifest.record(fileloc, inputs)
+    print(f"{fileloc} generated.")
+
+def kv_plots(pool, snap, fits, func, p0, target_dir, manifest, draw=True):
+  """
+  Fit and plot k vs V for every attempts value. Returns the file locations
+  and fitted parameters, both in order of attempts.
+  """
+  As = snap.As
+  groups = [snap.group(a) for a in As]
+  paramss = fit_all(pool, groups, fits, func, p0, [f"a={a}" for a in As])
+  filelocs = [os.path.join(target_dir, f"k-v-{a}.png") for a in As]
+
+  if draw:
+    code = source_digest(sys.modules[__name__], func)
+    draw_stale(pool, manifest, [
+      (fileloc, digest(code, a, xs, ys, params), kv_job, a, xs, ys, func, params, fileloc)
+      for a, (xs, ys), params, fileloc in zip(As, groups, paramss, filelocs)
+    ])
+  return filelocs, paramss
+
+def overlay_job(ks, attempts, ns, fileloc):
+  """ Measured V against the V predicted by the approximation of zeta, for every row """
+  predicted = predicted_v(ks, attempts, max(4 * int(ns.max()), 100))
+  fig, ax = figure("Approximated vs measured V", "measured V", "V predicted by approximation")
+  ax.set_xscale("log")
+  ax.set_yscale("log")
+  ax.scatter(ns, predicted, c=np.log10(attempts), s=8)
+  lo, hi = min(ns.min(), predicted.min()), max(ns.max(), predicted.max())
+  ax.plot([lo, hi], [lo, hi], c="k", lw=.5)
+  fig.savefig(fileloc)
+
+def overlay_plot(pool, snap, fileloc, manifest, draw=True):
+  if draw and len(snap.n):
+    code = source_digest(sys.modules[__name__], sys.modules[predicted_v.__module__])
+    draw_stale(pool, manifest, [
+      (fileloc, digest(code, snap.k, snap.attempts, snap.n), overlay_job, snap.k, snap.attempts, snap.n, fileloc)
+    ])
+  return fileloc
+
+def interval_plots(pool, plots, manifest, draw=True):
+  """ Render (xs, ys, los, his, title, x_label, y_label, fileloc) plots with error bars """
+  if draw:
+    code = source_digest(sys.modules[__name__])
+    draw_stale(pool, manifest, [
+      (plot[-1], digest(code, *plot), interval_job, *plot)
+      for plot in plots
+    ])
+  return [plot[-1] for plot in plots]
@@ -0,0 +1,255 @@
+"""
+Usage:
+  runner [--workers=<w>] [--chains=<c>] [--seed=<s>] [--db=<f>] [--witnesses=<d>] [--from-k=<k>] [--to-k=<k>] [--shard=<s>]
+
+Options:
+  -h --help        Show help
+  --workers=<w>    Number of worker processes (default: one per core)
+  --chains=<c>     Number of k run at once, lowest first [default: 2]
+  --seed=<s>       Root seed; every job's stream is derived from it, so a run
+                   with the same seed replays exactly
+  --db=<f>         Database to record V into [default: data.db]
+  --witnesses=<d>  Archive of colorings without a MAS(k) [default: witnesses]
+  --from-k=<k>     First k to run (default: resume from the smallest k with
+                   attempts values not recorded yet)
+  --to-k=<k>       Last k to run (default: never stop)
+  --shard=<s>      Only run the k of shard i of m, given as i/m, into a
+                   database of that shard's own (see shards.py)
+
+Multi-process replacement for trials.nim's worker threads.
+
+Jobs for one k run in order of increasing a, each starting from the raw
+counts (see store.py) its predecessors left behind, and only the lowest few
+unfinished k run at once, since V for a larger k may be out of reach. Every
+core works on those jobs instead: the colorings a job samples at some n are
+split into blocks, sampled side by side in worker processes, each block from
+its own random stream spawned from the root seed by
+`numpy.random.SeedSequence` and keyed by the job, n, and the block. Blocks are
+taken in order up to the first coloring without a MAS(k), so results do not
+depend on how many workers there are or which ran what.
+
+Results are written by the parent only, in batched transactions on a
+WAL-mode database, with an upsert in place of trials.nim's check-then-insert.
+Every coloring without a MAS(k) a job comes across is kept in the witness
+archive (see witnesses.py).
+"""
+
+import multiprocessing as mp
+import os
+import queue
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import count
+from threading import Thread
+from time import time
+
+import numpy as np
+
+from witnesses import Archive
+from shards import shard_of, parse_shard, open_shard
+from store import open_db, record_thresholds, add_counts, counts_for, v_from_counts, find_v_reusing
+from threshold import sample_until_failure
+
+C = 2
+As = list(range(500_000, 10_000_001, 500_000))
+
+def block_rng(entropy, job, n, block):
+  """ Independent random generator for a block of a job, the same whichever worker runs it """
+  return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(*job, int(n), block)))
+
+def block_sizes(attempts, smallest=256, largest=1 << 16):
+  """ Sizes of the blocks `attempts` colorings are sampled in; small at first, so failing n stay cheap """
+  size = smallest
+  while attempts > 0:
+    yield min(size, attempts)
+    attempts -= size
+    size = min(size * 2, largest)
+
+def sample_block(entropy, job, n, block, size):
+  c, k, attempts = job
+  return sample_until_failure(c, n, k, size, block_rng(entropy, job, n, block))
+
+def sample_in_blocks(submit, workers, entropy, job, c, n, k, attempts):
+  """
+  `sample_until_failure` with up to `workers` blocks sampled at once. Blocks
+  count in order, up to and including the first with a coloring without a
+  MAS(k); blocks after it are thrown away even if they were already sampled.
+  """
+  blocks = enumerate(block_sizes(attempts))
+  running = deque()
+  trials = successes = 0
+  try:
+    while True:
+      for block, size in blocks:
+        running.append(submit(sample_block, entropy, job, n, block, size))
+        if len(running) >= workers:
+          break
+      if not running:
+        return trials, successes, None
+      more_trials, more_successes, witness = running.popleft().result()
+      trials += more_trials
+      successes += more_successes
+      if witness is not None:
+        return trials, successes, witness
+  finally:
+    for future in running:
+      future.cancel()
+
+def attempts_for(c, k, shard=None):
+  """ The attempts values to run for (c, k); none if k is not a shard's (index, count) """
+  if shard is not None and shard_of(k, shard[1]) != shard[0]:
+    return []
+  return list(As)
+
+def resume_k(conn, c, shard=None):
+  """ The smallest k with an attempts value to run that is not recorded yet """
+  recorded = {}
+  for k, attempts in conn.execute("SELECT k, attempts FROM data WHERE c=?", (c,)):
+    recorded.setdefault(k, set()).add(attempts)
+  for k in count(1):
+    if not set(attempts_for(c, k, shard)) <= recorded.get(k, set()):
+      return k
+
+class Chain:
+  """ The remaining attempts values of one (c, k), run in order """
+
+  def __init__(self, conn, c, k, shard=None):
+    self.c, self.k = c, k
+    self.counts = counts_for(conn, c, k)
+    self.todo = attempts_for(c, k, shard)
+    self.lo = None
+    self.settled = []
+    # Attempts values already recorded, or settled by the counts, need no job
+    recorded = dict(conn.execute("SELECT attempts, n FROM data WHERE c=? AND k=?", (c, k)))
+    while self.todo:
+      attempts = self.todo[0]
+      n = recorded.get(attempts) or v_from_counts(self.counts, k, attempts)
+      if n is None:
+        break
+      if attempts not in recorded:
+        self.settled.append((c, k, attempts, n))
+      self.todo.pop(0)
+      self.lo = n - 1
+
+  def run(self, submit, workers, entropy, results):
+    """
+    Run the remaining jobs, meant for a thread of its own. Puts every job's
+    (job, V, new counts, witnesses) on `results`, then the chain itself once
+    done, or the exception it stopped on.
+    """
+    try:
+      while self.todo:
+        job = (self.c, self.k, self.todo.pop(0))
+        sample = partial(sample_in_blocks, submit, workers, entropy, job)
+        n, new_counts, witnesses = find_v_reusing(*job, self.counts, lo=self.lo, sample=sample)
+        self.finish(n, new_counts)
+        results.put((job, n, new_counts, witnesses))
+    except BaseException as e:
+      results.put(e)
+    else:
+      results.put(self)
+
+  def finish(self, n, new_counts):
+    for c, m, k, trials, successes in new_counts:
+      t, s = self.counts.get(m, (0, 0))
+      self.counts[m] = (t + trials, s + successes)
+    # zeta_a < 1 below V stays so for every larger a
+    self.lo = n - 1
+
+def chains(conn, from_k, to_k, shard=None):
+  ks = count(from_k) if to_k is None else range(from_k, to_k + 1)
+  for k in ks:
+    yield Chain(conn, C, k, shard)
+
+def run(conn, archive, entropy, workers, from_k, to_k, shard=None, open_chains=2, flush_every=64, flush_secs=10):
+  thresholds, new_counts, witnesses = [], [], []
+  last_flush = time()
+  todo = chains(conn, from_k, to_k, shard)
+  results = queue.Queue()
+
+  def flush():
+    with conn:
+      record_thresholds(conn, thresholds)
+      add_counts(conn, new_counts)
+    archive.add_all(witnesses)
+    thresholds.clear()
+    new_counts.clear()
+    witnesses.clear()
+
+  # Workers start once the chain threads first submit, so they are not forked
+  # from this process, where another thread may be holding a lock
+  method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+  pool = ProcessPoolExecutor(workers, mp_context=mp.get_context(method))
+  pending = set()
+
+  def submit(*args):
+    # Like `pool.submit`, but remembered until done, to cancel on the way out
+    future = pool.submit(*args)
+    pending.add(future)
+    future.add_done_callback(pending.discard)
+    return future
+
+  running = 0
+  try:
+    while True:
+      # Keep the lowest unfinished k running, each chain in a thread of its
+      # own that farms its sampling out to the shared pool
+      while running < open_chains:
+        chain = next(todo, None)
+        if chain is None:
+          break
+        thresholds.extend(chain.settled)
+        if chain.todo:
+          Thread(target=chain.run, args=(submit, workers, entropy, results), daemon=True).start()
+          running += 1
+      if not running:
+        break
+
+      try:
+        result = results.get(timeout=flush_secs)
+      except queue.Empty:
+        result = None
+      if isinstance(result, BaseException):
+        raise result
+      elif isinstance(result, Chain):
+        running -= 1
+      elif result is not None:
+        (c, k, attempts), n, job_counts, job_witnesses = result
+        print(f"[c={c}] [k={k}] [a={attempts}] :: V = {n}")
+        thresholds.append((c, k, attempts, n))
+        new_counts.extend(job_counts)
+        witnesses.extend(job_witnesses)
+
+      if len(thresholds) >= flush_every or time() - last_flush >= flush_secs:
+        flush()
+        last_flush = time()
+  finally:
+    try:
+      for future in list(pending):
+        future.cancel()
+      pool.shutdown(wait=True)
+    finally:
+      flush()
+
+if __name__ == "__main__":
+  from docopt import docopt
+
+  clargs = docopt(__doc__)
+  shard = clargs["--shard"] and parse_shard(clargs["--shard"])
+  conn = open_db(clargs["--db"]) if shard is None else open_shard(clargs["--db"], *shard)
+
+  workers = int(clargs["--workers"] or os.cpu_count())
+  seed = clargs["--seed"]
+  entropy = np.random.SeedSequence(None if seed is None else int(seed)).entropy
+  print(f"Seed: {entropy}")
+
+  from_k = clargs["--from-k"] or resume_k(conn, C, shard)
+  to_k = clargs["--to-k"] and int(clargs["--to-k"])
+
+  try:
+    run(conn, Archive(clargs["--witnesses"]), entropy, workers, int(from_k), to_k, shard, int(clargs["--chains"]))
+  except KeyboardInterrupt:
+    pass
+  finally:
+    conn.close()
@@ -0,0 +1,93 @@
+"""
+Model selection for the k vs V curves.
+
+Every family in models.py is fitted to every attempts value's k vs V data,
+all side by side in the pool, and the fits are ranked by the Akaike and
+Bayesian information criteria, which charge the four-parameter families for
+their extra parameters, and by plain residual error. Each family is fitted
+by `render.fit_all`, warm starts from neighbouring attempts values included,
+exactly as the paper's exponential fits are, so the exponential ranked here
+is the one the paper reports, and a rebuild only refits what changed.
+"""
+
+import inspect
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from fitcache import run_fit, residual
+from render import fit_all
+import models
+
+# (name, function, initial guess) of every family
+FAMILIES = [
+  ("exponential", models.exponential, [0, 1, .5, 0]),
+  ("logistic", models.logistic, [0, 1000, 1, 8]),
+  ("monomial", models.monomial, [0, 1, 2, 0]),
+  ("logarithmic", models.logarithmic, [0, 1, 1, 0]),
+  ("linear", models.linear, [0, 1]),
+  ("reciprocal", models.reciprocal, [0, 1]),
+  ("arctan", models.arctan, [0, 1, 1, 0]),
+  ("tanh", models.tanh, [0, 1, 1, 0]),
+  ("reciprocalSq", models.reciprocalSq, [0, 1]),
+]
+
+def param_count(func):
+  return len(inspect.signature(func).parameters) - 1
+
+def try_fit(func, xs, ys, p0, seed=None, fallback=True):
+  """ Like `run_fit`, but an empty array for a fit that fails or goes non-finite """
+  with warnings.catch_warnings(), np.errstate(all="ignore"):
+    warnings.simplefilter("ignore")
+    try:
+      params = run_fit(func, xs, ys, p0, seed, fallback)
+    except (RuntimeError, ValueError):
+      return np.array([])
+    if params is None or not np.isfinite(residual(func, xs, ys, params)):
+      return np.array([])
+  return params
+
+def criteria(func, xs, ys, params):
+  """ (AIC, BIC, residual) of a least-squares fit, assuming Gaussian errors """
+  n, p = len(ys), param_count(func)
+  with np.errstate(all="ignore"):
+    rss = residual(func, xs, ys, params)
+  # -2 log-likelihood up to a constant; infinite for a perfect fit, so floored
+  deviance = float(n * np.log(max(rss, 1e-12) / n))
+  return deviance + 2 * p, deviance + p * float(np.log(n)), rss
+
+def select(pool, groups, fits, families=FAMILIES):
+  """
+  Fit every family to every (xs, ys) group. Returns, per group, a list of
+  (name, params, (AIC, BIC, residual)) sorted by AIC, leaving out families
+  that did not converge or have at least as many parameters as data points.
+  """
+  def fit_family(family):
+    name, func, p0 = family
+    fitted = [i for i, (xs, ys) in enumerate(groups) if param_count(func) < len(xs)]
+    paramss = fit_all(pool, [groups[i] for i in fitted], fits, func, p0, [f"{name} {i}" for i in fitted], try_fit)
+    return dict(zip(fitted, paramss))
+
+  # Each family waits on its own waves of fits, so each gets a thread
+  with ThreadPoolExecutor(len(families)) as threads:
+    fitted = list(threads.map(fit_family, families))
+
+  rankings = [[] for _ in groups]
+  for i, (xs, ys) in enumerate(groups):
+    for (name, func, p0), paramss in zip(families, fitted):
+      params = paramss.get(i)
+      if params is None:
+        continue
+      ranked = criteria(func, xs, ys, params)
+      if np.isfinite(ranked[2]):
+        rankings[i].append((name, params, ranked))
+    rankings[i].sort(key=lambda ranked: ranked[2][0])
+  return rankings
+
+def winners(ranking):
+  """ The best family by AIC, by BIC, and by residual error """
+  return tuple(
+    min(ranking, key=lambda ranked: ranked[2][i])[0] if ranking else None
+    for i in range(3)
+  )
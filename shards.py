@@ -0,0 +1,165 @@
+"""
+Usage:
+  shards plan <shards> [--from-k=<k>] [--to-k=<k>]
+  shards merge <db> <shard_db>...
+  shards show <db>
+
+Options:
+  -h --help     Show help
+  --from-k=<k>  First k to list [default: 1]
+  --to-k=<k>    Last k to list [default: 10]
+
+Splitting trials across machines that share no storage.
+
+Every k is assigned, with all its attempts values, to one of m shards, k
+going round the shards in turn, so any machine can tell which k are its own
+without asking the others. Keeping a k on one machine keeps the raw counts of
+its smaller a for its larger a to reuse (see store.py), and going round in
+turn gives every machine one of the cheapest unfinished k at any time.
+`runner --shard=i/m` only runs the k of shard i, into a database of its own
+that records, in a `meta` table, a random id for the shard and which of the m
+shards it is.
+
+`shards merge` then folds shard databases into the analysis database:
+thresholds found by more than one shard keep the smallest n, and every
+shard's thresholds are kept in a `provenance` table. Raw counts are summed,
+but a shard only contributes what it has sampled since it was last merged
+into that database, so merging the same shard again, e.g. after it has run
+some more, never counts anything twice.
+"""
+
+import uuid
+from datetime import datetime, timezone
+
+from store import open_db, record_thresholds, add_counts, record_exact
+
+def shard_of(k, shards):
+  """ Which of `shards` shards runs the jobs of k; the same on every machine """
+  return (k - 1) % shards
+
+def parse_shard(spec):
+  """ (index, count) from "i/m" """
+  index, count = map(int, spec.split("/"))
+  if not 0 <= index < count:
+    raise ValueError(f"Shard {spec} does not exist; shards are numbered 0 to m-1.")
+  return index, count
+
+def open_shard(fileloc, index, count):
+  """ Open (or create) the database of shard `index` of `count` """
+  conn = open_db(fileloc)
+  conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+  with conn:
+    conn.executemany("INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)", [
+      ("uuid", str(uuid.uuid4())),
+      ("shard", str(index)),
+      ("shards", str(count)),
+    ])
+  meta = dict(conn.execute("SELECT key, value FROM meta"))
+  if (int(meta["shard"]), int(meta["shards"])) != (index, count):
+    raise ValueError(f"{fileloc} holds shard {meta['shard']}/{meta['shards']}, not {index}/{count}.")
+  return conn
+
+def open_merged(fileloc):
+  """ Open (or create) an analysis database along with its merge bookkeeping """
+  conn = open_db(fileloc)
+  conn.execute("""
+  CREATE TABLE IF NOT EXISTS provenance (
+    shard TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    c INTEGER NOT NULL,
+    k INTEGER NOT NULL,
+
+    n INTEGER NOT NULL,
+    PRIMARY KEY (shard, c, k, attempts)
+  )
+  """)
+  conn.execute("""
+  CREATE TABLE IF NOT EXISTS merged_counts (
+    shard TEXT NOT NULL,
+    c INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    k INTEGER NOT NULL,
+
+    trials INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    PRIMARY KEY (shard, c, k, n)
+  )
+  """)
+  conn.execute("""
+  CREATE TABLE IF NOT EXISTS merges (
+    shard TEXT NOT NULL,
+    fileloc TEXT NOT NULL,
+    shard_index INTEGER NOT NULL,
+    shard_count INTEGER NOT NULL,
+    merged_at TEXT NOT NULL
+  )
+  """)
+  return conn
+
+def merge(conn, shard_fileloc):
+  """
+  Fold one shard database into conn, in one transaction. Returns the shard's
+  id, how many thresholds it has, and how many counts it brought in.
+  """
+  conn.execute("ATTACH DATABASE ? AS shard", (shard_fileloc,))
+  try:
+    meta = dict(conn.execute("SELECT key, value FROM shard.meta"))
+    shard = meta["uuid"]
+    with conn:
+      thresholds = conn.execute("SELECT c, k, attempts, n FROM shard.data").fetchall()
+      record_thresholds(conn, thresholds)
+      conn.executemany("""
+      INSERT INTO provenance (shard, c, k, attempts, n) VALUES (?, ?, ?, ?, ?)
+      ON CONFLICT (shard, c, k, attempts) DO UPDATE SET n = excluded.n
+      """, [(shard, *row) for row in thresholds])
+
+      # Only what was sampled since the last merge of this shard is new
+      deltas = conn.execute("""
+      SELECT s.c, s.n, s.k, s.trials - IFNULL(m.trials, 0), s.successes - IFNULL(m.successes, 0)
+      FROM shard.counts s LEFT JOIN merged_counts m
+        ON m.shard = ? AND m.c = s.c AND m.k = s.k AND m.n = s.n
+      WHERE s.trials > IFNULL(m.trials, 0)
+      """, (shard,)).fetchall()
+      add_counts(conn, deltas)
+      conn.execute("""
+      INSERT OR REPLACE INTO merged_counts (shard, c, n, k, trials, successes)
+      SELECT ?, c, n, k, trials, successes FROM shard.counts
+      """, (shard,))
+
+      # Exact counts are the same whoever computed them
+      record_exact(conn, conn.execute("SELECT c, n, k, colorings FROM shard.exact").fetchall())
+
+      conn.execute("INSERT INTO merges (shard, fileloc, shard_index, shard_count, merged_at) VALUES (?, ?, ?, ?, ?)", (
+        shard, shard_fileloc, int(meta["shard"]), int(meta["shards"]), datetime.now(timezone.utc).isoformat(),
+      ))
+  finally:
+    conn.execute("DETACH DATABASE shard")
+  return shard, len(thresholds), len(deltas)
+
+if __name__ == "__main__":
+  from docopt import docopt
+  import runner
+
+  clargs = docopt(__doc__)
+
+  if clargs["plan"]:
+    shards = int(clargs["<shards>"])
+    by_shard = [[] for _ in range(shards)]
+    for k in range(int(clargs["--from-k"]), int(clargs["--to-k"]) + 1):
+      by_shard[shard_of(k, shards)].append(k)
+    for i, ks in enumerate(by_shard):
+      print(f"[shard={i}/{shards}] :: k = {', '.join(map(str, ks))}; {len(ks) * len(runner.As)} jobs")
+
+  elif clargs["merge"]:
+    conn = open_merged(clargs["<db>"])
+    for shard_fileloc in clargs["<shard_db>"]:
+      shard, thresholds, deltas = merge(conn, shard_fileloc)
+      print(f"{shard_fileloc} ({shard}) merged: {thresholds} thresholds, {deltas} new counts.")
+    conn.close()
+
+  elif clargs["show"]:
+    conn = open_merged(clargs["<db>"])
+    for shard, fileloc, index, count, merged_at in conn.execute("SELECT * FROM merges ORDER BY merged_at"):
+      thresholds = conn.execute("SELECT COUNT(*) FROM provenance WHERE shard=?", (shard,)).fetchone()[0]
+      print(f"{merged_at} :: shard {index}/{count} ({shard}) from {fileloc}, {thresholds} thresholds")
+    conn.close()
@@ -0,0 +1,71 @@
+"""
+Columnar snapshot of the `data` table for paper.py.
+
+The table is read once, through a read-only connection so that a running
+trial runner is never blocked, sorted by (attempts, k) and saved as .npz next
+to the other crunched files. Later builds reuse the snapshot for as long as
+the table's stamp, a cheap aggregate over it that moves whenever rows are
+added, removed or changed, stays the same.
+"""
+
+import os
+import sqlite3 as s3
+
+import numpy as np
+
+import tracing
+
+COLUMNS = ("attempts", "c", "k", "n")
+
+def connect_ro(fileloc):
+  return s3.connect(f"file:{fileloc}?mode=ro", uri=True)
+
+def stamp(conn):
+  return np.array(conn.execute("SELECT COUNT(*), IFNULL(MAX(rowid), 0), TOTAL(n) FROM data").fetchone())
+
+class Snapshot:
+  def __init__(self, stamp, attempts, c, k, n):
+    self.stamp = stamp
+    self.attempts, self.c, self.k, self.n = attempts, c, k, n
+    # Rows are sorted by attempts, so each attempts value is one slice
+    self.As, starts = np.unique(attempts, return_index=True)
+    ends = np.append(starts[1:], len(attempts))
+    self.slices = {a: slice(start, end) for a, start, end in zip(self.As.tolist(), starts, ends)}
+    self.As = self.As.tolist()
+
+  def group(self, a):
+    """ The (ks, Vs) recorded for some attempts value """
+    where = self.slices.get(a, slice(0))
+    return self.k[where], self.n[where]
+
+  def groups(self):
+    for a in self.As:
+      yield (a, *self.group(a))
+
+  def save(self, fileloc):
+    np.savez(fileloc, stamp=self.stamp, **{col: getattr(self, col) for col in COLUMNS})
+
+def read(conn):
+  with tracing.span("query"):
+    rows = conn.execute("SELECT attempts, c, k, n FROM data ORDER BY attempts, k").fetchall()
+  columns = np.array(rows, dtype=np.int64).reshape(-1, len(COLUMNS)).T
+  return Snapshot(stamp(conn), *columns)
+
+def load(db_fileloc, snapshot_fileloc):
+  """ Load the snapshot of a database, re-reading the database only if it has changed """
+  conn = connect_ro(db_fileloc)
+  try:
+    # One read transaction, so the stamp always describes the rows read
+    conn.execute("BEGIN")
+    with tracing.span("stamp"):
+      current = stamp(conn)
+    if os.path.isfile(snapshot_fileloc):
+      with np.load(snapshot_fileloc) as saved:
+        if np.array_equal(saved["stamp"], current):
+          return Snapshot(current, *(saved[col] for col in COLUMNS))
+    snap = read(conn)
+  finally:
+    conn.close()
+  snap.save(snapshot_fileloc)
+  tracing.count("bytes written", os.path.getsize(snapshot_fileloc))
+  return snap
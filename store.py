@@ -0,0 +1,155 @@
+"""
+Usage:
+  store <k> [--c=<c>] [--db=<f>]
+
+Options:
+  -h --help  Show help
+  --c=<c>    Number of colors [default: 2]
+  --db=<f>   Database to read [default: data.db]
+
+Results store shared by the trial runners and the paper.
+
+Alongside the `data` table of thresholds, the `counts` table keeps the raw
+cumulative (trials, successes) behind every sampled (c, n, k). Larger runs
+only sample the difference: going from a = 9.5M to a = 10M needs 500k new
+colorings at the n still passing, and none at the n already known to fail,
+since a coloring without a MAS(k) fails that n for every larger a too.
+"""
+
+import sqlite3 as s3
+
+from threshold import find_v, sample_until_failure
+
+def open_db(fileloc):
+  conn = s3.connect(fileloc)
+  conn.execute("PRAGMA journal_mode=WAL")
+  conn.execute("""
+  CREATE TABLE IF NOT EXISTS data (
+    attempts INTEGER NOT NULL,
+    c INTEGER NOT NULL,
+    k INTEGER NOT NULL,
+
+    n INTEGER NOT NULL
+  )
+  """)
+  conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS cka_index ON data (c, k, attempts)")
+  conn.execute("""
+  CREATE TABLE IF NOT EXISTS counts (
+    c INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    k INTEGER NOT NULL,
+
+    trials INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    PRIMARY KEY (c, k, n)
+  )
+  """)
+  conn.execute("""
+  CREATE TABLE IF NOT EXISTS exact (
+    c INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    k INTEGER NOT NULL,
+
+    colorings INTEGER NOT NULL,
+    PRIMARY KEY (c, k, n)
+  )
+  """)
+  return conn
+
+def record_thresholds(conn, rows):
+  """ Record (c, k, attempts, n) rows, keeping the smaller n on conflict """
+  conn.executemany("""
+  INSERT INTO data (c, k, attempts, n) VALUES (?, ?, ?, ?)
+  ON CONFLICT (c, k, attempts) DO UPDATE SET n = MIN(n, excluded.n)
+  """, rows)
+
+def add_counts(conn, rows):
+  """ Add (c, n, k, trials, successes) rows onto the cumulative counts """
+  conn.executemany("""
+  INSERT INTO counts (c, n, k, trials, successes) VALUES (?, ?, ?, ?, ?)
+  ON CONFLICT (c, k, n) DO UPDATE SET
+    trials = trials + excluded.trials,
+    successes = successes + excluded.successes
+  """, rows)
+
+def counts_for(conn, c, k):
+  """ {n: (trials, successes)} for every sampled n """
+  rows = conn.execute("SELECT n, trials, successes FROM counts WHERE c=? AND k=?", (c, k))
+  return {n: (trials, successes) for n, trials, successes in rows}
+
+def passes(counts, n, attempts):
+  """ True/False if the counts decide whether zeta_attempts(c, n, k) = 1, else None """
+  trials, successes = counts.get(n, (0, 0))
+  if successes < trials:
+    return False
+  if trials >= attempts:
+    return True
+  return None
+
+def v_from_counts(counts, k, attempts):
+  """
+  V(c, k, attempts) from cumulative counts: the first n that passes and whose
+  predecessor is known to fail (or cannot fit a MAS(k) at all). None if the
+  counts do not settle it. Failures found by larger runs count against
+  smaller a too, so this never exceeds the V recorded when a was run.
+  """
+  passing = [n for n in counts if passes(counts, n, attempts)]
+  if not passing:
+    return None
+  n = min(passing)
+  if n - 1 < k or passes(counts, n - 1, attempts) is False:
+    return n
+  return None
+
+def derive_v(conn, c, k, attempts):
+  return v_from_counts(counts_for(conn, c, k), k, attempts)
+
+def record_exact(conn, rows):
+  """ Record (c, n, k, colorings) rows, colorings being the number without a MAS(k) """
+  conn.executemany("INSERT OR REPLACE INTO exact (c, n, k, colorings) VALUES (?, ?, ?, ?)", rows)
+
+def exact_counts(conn, c, k):
+  """ {n: number of colorings without a MAS(k)} for every n counted exactly """
+  return dict(conn.execute("SELECT n, colorings FROM exact WHERE c=? AND k=?", (c, k)))
+
+def zeta_curve(conn, c, k):
+  """ Sorted (n, trials, successes) rows, e.g. for plotting zeta_a(n) """
+  return conn.execute("SELECT n, trials, successes FROM counts WHERE c=? AND k=? ORDER BY n", (c, k)).fetchall()
+
+def find_v_reusing(c, k, attempts, counts, rng=None, lo=None, sample=None):
+  """
+  Like `threshold.find_v`, but only samples what `counts` leaves undecided.
+  Returns V, the new (c, n, k, trials, successes) rows to add, and the
+  (c, n, k, row) colorings without a MAS(k) found along the way. `sample`
+  stands in for `threshold.sample_until_failure` (without its rng), e.g. to
+  spread the sampling over several processes.
+  """
+  sample = sample or (lambda c, n, k, attempts: sample_until_failure(c, n, k, attempts, rng))
+  counts = dict(counts)
+  new = {}
+  witnesses = []
+
+  def top_up(n):
+    verdict = passes(counts, n, attempts)
+    if verdict is not None:
+      return verdict
+    trials, successes = counts.get(n, (0, 0))
+    more_trials, more_successes, witness = sample(c, n, k, attempts - trials)
+    if witness is not None:
+      witnesses.append((c, n, k, witness))
+    counts[n] = (trials + more_trials, successes + more_successes)
+    t, s = new.get(n, (0, 0))
+    new[n] = (t + more_trials, s + more_successes)
+    return passes(counts, n, attempts)
+
+  v = find_v(c, k, attempts, rng, lo, top_up)
+  return v, [(c, n, k, t, s) for n, (t, s) in sorted(new.items())], witnesses
+
+if __name__ == "__main__":
+  from docopt import docopt
+
+  clargs = docopt(__doc__)
+  conn = open_db(clargs["--db"])
+  c, k = int(clargs["--c"]), int(clargs["<k>"])
+  for n, trials, successes in zeta_curve(conn, c, k):
+    print(f"[c={c}] [n={n}] [k={k}] :: {successes / trials * 100:.1f}% ({successes}/{trials})")
@@ -0,0 +1,93 @@
+"""
+Usage:
+  sweep <k> <attempts> [--max-n=<n>] [--seed=<s>]
+
+Options:
+  -h --help    Show help
+  --max-n=<n>  Stop growing colorings at this size
+  --seed=<s>   Seed for the random generator
+
+Estimate zeta_a(c, n, k) for every n in a single sweep.
+
+Rather than drawing fresh colorings for each n, a population of colorings is
+grown one position at a time. A coloring of size n + 1 is a coloring of size
+n plus one position, so the only progressions that can be new are the ones
+ending at that position; only those are checked. Colorings are dropped as
+soon as they gain a MAS(k), since every extension of them has one too.
+"""
+
+import numpy as np
+
+from mas import WORD
+
+def new_mas(cols, p, k):
+  """ For each packed row, is there a MAS(k) ending at position p? """
+  steps = np.arange(1, p // (k - 1) + 1)
+  if not len(steps):
+    return np.zeros(len(cols), dtype=bool)
+
+  # Positions p - step, p - 2 * step, ... for every step at once
+  positions = p - steps[:, None] * np.arange(1, k)
+  words = positions // WORD
+  offsets = (positions % WORD).astype(np.uint64)
+
+  last = (cols[:, p // WORD] >> np.uint64(p % WORD)) & np.uint64(1)
+  earlier = (cols[:, words] >> offsets) & np.uint64(1)
+  return (earlier == last[:, None, None]).all(axis=2).any(axis=1)
+
+def sweep_batch(k, count, n_max, rng):
+  """ Sweep one population; returns the number of colorings alive at each n """
+  alive = [count]
+  cols = np.empty((count, 0), dtype=np.uint64)
+  n = 0
+  while len(cols) and (n_max is None or n < n_max):
+    if n % WORD == 0:
+      # Positions are random independent bits, so a word of them may be
+      # drawn at once and revealed one position at a time
+      fresh = rng.integers(0, 2**64, size=(len(cols), 1), dtype=np.uint64, endpoint=False)
+      cols = np.concatenate([cols, fresh], axis=1)
+    n += 1
+    if k == 1:
+      cols = cols[:0]
+    elif n >= k:
+      cols = cols[~new_mas(cols, n - 1, k)]
+    alive.append(len(cols))
+  return np.array(alive)
+
+def sweep(c, k, attempts, n_max=None, rng=None, batch=1 << 14):
+  """
+  Returns successes such that successes[n] / attempts = zeta_attempts(c, n, k)
+  for every n up to the first n with zeta_attempts = 1 (or n_max).
+  """
+  assert c == 2
+  rng = rng or np.random.default_rng()
+  alive = np.zeros(1, dtype=np.int64)
+  remaining = attempts
+  while remaining > 0:
+    size = min(batch, remaining)
+    counts = sweep_batch(k, size, n_max, rng)
+    if len(counts) > len(alive):
+      alive = np.pad(alive, (0, len(counts) - len(alive)))
+    alive[:len(counts)] += counts
+    remaining -= size
+  return attempts - alive
+
+def v_from_successes(successes, attempts):
+  """ First n for which zeta_a = 1, or None if the sweep never got there """
+  hits = np.flatnonzero(successes == attempts)
+  return int(hits[0]) if len(hits) else None
+
+if __name__ == "__main__":
+  from docopt import docopt
+
+  clargs = docopt(__doc__)
+  k, attempts = int(clargs["<k>"]), int(clargs["<attempts>"])
+  n_max = clargs["--max-n"] and int(clargs["--max-n"])
+  seed = clargs["--seed"]
+  rng = np.random.default_rng(None if seed is None else int(seed))
+
+  successes = sweep(2, k, attempts, n_max, rng)
+  for n, s in enumerate(successes):
+    if n >= k:
+      print(f"[c=2] [n={n}] [k={k}] [a={attempts}] :: {s / attempts * 100:.1f}% ({s})")
+  print(f"V = {v_from_successes(successes, attempts)}")
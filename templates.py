@@ -0,0 +1,121 @@
+"""
+The templating paper.py writes its LaTeX with.
+
+A template is LaTeX in which `[[ expr ]]` is replaced with the value of a
+Python expression, `[[ expr:fmt ]]` with it formatted by an f-string format
+spec, and `[[ expr!r ]]` with its repr. Everything else, braces and
+backslashes included, is kept as is. An expression ends at the first `]]`,
+and in `[[[` the first bracket is plain text, so `$[[[lo]], [[hi]]]$` is an
+interval.
+
+Templates are parsed and their expressions compiled once, the first time
+they are used, and rendered against an explicit context of names rather than
+a module's globals. `Writer` streams rendered sections to a file as they are
+produced instead of holding the whole document.
+"""
+
+import os
+from functools import lru_cache
+
+CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
+def split_field(field):
+  """ (expression, conversion, format spec) of the inside of a [[ ]] """
+  depth = 0
+  quote = None
+  for i, car in enumerate(field):
+    if quote:
+      if car == quote:
+        quote = None
+    elif car in "'\"":
+      quote = car
+    elif car in "([{":
+      depth += 1
+    elif car in ")]}":
+      depth -= 1
+    elif depth == 0 and car == ":":
+      return field[:i], None, field[i + 1:].rstrip()
+    elif depth == 0 and car == "!" and field[i + 1:i + 2] != "=":
+      conversion, rest = field[i + 1:i + 2], field[i + 2:].lstrip()
+      if conversion not in CONVERSIONS or rest[:1] not in ("", ":"):
+        raise SyntaxError(f"Bad conversion in template field [[{field}]].")
+      return field[:i], conversion, rest[1:].rstrip()
+  return field, None, ""
+
+class Template:
+  def __init__(self, source):
+    self.source = source
+    # Literal strings and (code, conversion, format spec) fields, in order
+    self.parts = []
+    pos = 0
+    while True:
+      start = source.find("[[", pos)
+      if start == -1:
+        break
+      while source.startswith("[", start + 2):
+        start += 1
+      end = source.find("]]", start + 2)
+      if end == -1:
+        raise SyntaxError(f"Unclosed [[ in template at {source[start:start + 30]!r}.")
+      if start > pos:
+        self.parts.append(source[pos:start])
+      expression, conversion, spec = split_field(source[start + 2:end])
+      code = compile(expression.strip(), f"[[{expression}]]", "eval")
+      self.parts.append((code, conversion and CONVERSIONS[conversion], spec))
+      pos = end + 2
+    if pos < len(source):
+      self.parts.append(source[pos:])
+    self.literal = all(isinstance(part, str) for part in self.parts)
+
+  def __call__(self, context):
+    if self.literal:
+      return "".join(self.parts)
+    scope = dict(context)
+    rendered = []
+    for part in self.parts:
+      if isinstance(part, str):
+        rendered.append(part)
+      else:
+        code, conversion, spec = part
+        value = eval(code, scope)
+        rendered.append(format(conversion(value) if conversion else value, spec))
+    return "".join(rendered)
+
+@lru_cache(maxsize=None)
+def compile_template(source):
+  return Template(source)
+
+def specify(template, context):
+  """ Fill in a template, evaluating its expressions in the dict `context` """
+  return compile_template(template)(context)
+
+def each(template, contexts, sep=""):
+  """ A template rendered once per context, e.g. one table row per attempts value """
+  compiled = compile_template(template)
+  return sep.join(compiled(context) for context in contexts)
+
+class Writer:
+  """
+  Writes sections, separated by `sep`, to a file as they are rendered. They go
+  to a .partial file first, which replaces fileloc only once closed, so a
+  build that fails halfway leaves the last good file in place.
+  """
+
+  def __init__(self, fileloc, sep="\n"):
+    self.fileloc = fileloc
+    self.partial_fileloc = fileloc + ".partial"
+    self.sep = sep
+    self.file = open(self.partial_fileloc, "w")
+    self.first = True
+
+  def write(self, section):
+    if not self.first:
+      self.file.write(self.sep)
+    self.file.write(section)
+    self.first = False
+
+  def close(self):
+    """ Put the finished file in place; returns its size """
+    self.file.close()
+    os.replace(self.partial_fileloc, self.fileloc)
+    return os.path.getsize(self.fileloc)
@@ -0,0 +1,35 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+from exact import count_mas_free
+
+def brute_count(n, k):
+  """ Number of 2-colorings of size n without a MAS(k), checking each """
+  def mas_free(colors):
+    if k == 1:
+      return n == 0
+    return not any(
+      len({colors[start + i * step] for i in range(k)}) == 1
+      for step in range(1, n)
+      for start in range(n - (k - 1) * step)
+    )
+  return sum(mas_free(colors) for colors in product((0, 1), repeat=n))
+
+class CountMASFreeTest(unittest.TestCase):
+  def test_brute_force(self):
+    for n in range(0, 17):
+      for k in range(1, 5):
+        self.assertEqual(count_mas_free(n, k), brute_count(n, k), f"n={n}, k={k}")
+
+  def test_shallow_subtrees(self):
+    # However deep the split into jobs goes, the count is the same
+    for depth in range(1, 5):
+      self.assertEqual(count_mas_free(13, 3, depth=depth), brute_count(13, 3))
+
+  def test_pool(self):
+    with ProcessPoolExecutor(2) as pool:
+      self.assertEqual(count_mas_free(12, 3, pool), brute_count(12, 3))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+
+from mas import has_mas, random_colorings, to_string, from_string, pack, unpack
+
+def brute_has_mas(s, k):
+  """ Does the coloring string s contain a MAS(k)? Checks every progression """
+  n = len(s)
+  if k == 1:
+    return n >= 1
+  for step in range(1, n):
+    for start in range(n - (k - 1) * step):
+      if len({s[start + i * step] for i in range(k)}) == 1:
+        return True
+  return False
+
+class HasMASTest(unittest.TestCase):
+  def test_every_small_coloring(self):
+    for n in range(0, 13):
+      cols = np.arange(2 ** n, dtype=np.uint64)[:, None] if n else np.zeros((1, 1), dtype=np.uint64)
+      for k in range(1, 5):
+        expected = [brute_has_mas(to_string(row, n), k) for row in cols]
+        self.assertEqual(has_mas(cols, n, k).tolist(), expected, f"n={n}, k={k}")
+
+  def test_random_multiword(self):
+    rng = np.random.default_rng(0)
+    for n in (63, 64, 65, 100, 129):
+      cols = random_colorings(rng, 50, n)
+      for k in (4, 5, 6, 8):
+        expected = [brute_has_mas(to_string(row, n), k) for row in cols]
+        self.assertEqual(has_mas(cols, n, k).tolist(), expected, f"n={n}, k={k}")
+
+  def test_packing(self):
+    s = "0110100110010110" * 5
+    row = from_string(s)
+    self.assertEqual(to_string(row, len(s)), s)
+    np.testing.assert_array_equal(pack(unpack(row, len(s))), row)
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import render
+from fitcache import FitCache, explains, fit_key
+from models import exponential
+
+def groups(count):
+  xs = np.arange(3, 13, dtype=np.float64)
+  return [(xs, 2 + (5 + a) * np.exp(-.4 * xs)) for a in range(count)]
+
+class NoPool:
+  """ A pool that fails the test if anything is submitted to it """
+  def submit(self, *args):
+    raise AssertionError("Fit submitted although it was cached.")
+
+class Recording:
+  """ A pool that remembers the name of every span submitted to it """
+  def __init__(self, pool):
+    self.pool = pool
+    self.names = []
+
+  def submit(self, job, name, *args):
+    self.names.append(name)
+    return self.pool.submit(job, name, *args)
+
+class FitAllTest(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.TemporaryDirectory()
+    self.fileloc = os.path.join(self.dir.name, "fits.json")
+    self.pool = render.pool(2)
+
+  def tearDown(self):
+    self.pool.shutdown()
+    self.dir.cleanup()
+
+  def fit_all(self, pool, fits):
+    # Group 0 never explains its data, so it is refitted from every other group
+    def rejecting(func, xs, ys, params):
+      return not np.array_equal(ys, groups(4)[0][1]) and explains(func, xs, ys, params)
+    with mock.patch.object(render, "explains", rejecting):
+      return render.fit_all(pool, groups(4), fits, exponential, [0, 1, .5, 0], labels=[10, 20, 30, 40])
+
+  def test_refit_waves(self):
+    fits = FitCache(self.fileloc)
+    paramss = self.fit_all(self.pool, fits)
+    self.assertEqual(len(paramss), 4)
+    self.assertTrue(all(params is not None and len(params) == 4 for params in paramss))
+    # One fit per group from p0, and a refit of group 0 from each other group
+    self.assertEqual(len(fits.seeds(fit_key(exponential, *groups(4)[0], [0, 1, .5, 0]))), 3)
+    self.assertEqual(len([key for key in fits.used if not key.startswith("seeds:")]), 4 + 3)
+    fits.save()
+
+    # A rebuild replays every wave from the cache alone
+    again = self.fit_all(NoPool(), FitCache(self.fileloc))
+    for params, cached in zip(paramss, again):
+      np.testing.assert_array_equal(params, cached)
+
+  def test_new_group_seeded(self):
+    fits = FitCache(self.fileloc)
+    render.fit_all(self.pool, groups(4)[1:], fits, exponential, [0, 1, .5, 0])
+    fits.save()
+
+    # One more attempts value is only fitted from its neighbour's fit
+    pool = Recording(self.pool)
+    paramss = render.fit_all(pool, groups(4), FitCache(self.fileloc), exponential, [0, 1, .5, 0])
+    self.assertEqual(pool.names, ["refit"])
+    self.assertTrue(explains(exponential, *groups(4)[0], paramss[0]))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from shards import open_shard, open_merged, merge, shard_of
+from store import record_thresholds, add_counts
+
+class MergeTest(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.TemporaryDirectory()
+    self.shard_locs = [os.path.join(self.dir.name, f"shard{i}.db") for i in range(2)]
+    self.shards = [open_shard(fileloc, i, 2) for i, fileloc in enumerate(self.shard_locs)]
+    self.conn = open_merged(os.path.join(self.dir.name, "data.db"))
+
+  def tearDown(self):
+    for conn in (*self.shards, self.conn):
+      conn.close()
+    self.dir.cleanup()
+
+  def run_shard(self, i, thresholds, counts):
+    with self.shards[i]:
+      record_thresholds(self.shards[i], thresholds)
+      add_counts(self.shards[i], counts)
+
+  def counts(self, conn):
+    return {(c, n, k): (t, s) for c, n, k, t, s in conn.execute("SELECT c, n, k, trials, successes FROM counts")}
+
+  def summed(self):
+    total = {}
+    for shard in self.shards:
+      for key, (t, s) in self.counts(shard).items():
+        t0, s0 = total.get(key, (0, 0))
+        total[key] = (t0 + t, s0 + s)
+    return total
+
+  def test_remerge(self):
+    self.run_shard(0, [(2, 1, 500, 3)], [(2, 2, 1, 500, 500), (2, 3, 1, 500, 500)])
+    self.run_shard(1, [(2, 2, 500, 9)], [(2, 8, 2, 40, 39), (2, 9, 2, 500, 500)])
+    for fileloc in self.shard_locs:
+      merge(self.conn, fileloc)
+    self.assertEqual(self.counts(self.conn), self.summed())
+
+    # Shard 0 runs further, then both are merged again
+    self.run_shard(0, [(2, 1, 1000, 3)], [(2, 3, 1, 500, 500), (2, 4, 1, 1000, 1000)])
+    _, _, deltas = merge(self.conn, self.shard_locs[0])
+    self.assertEqual(deltas, 2)
+    _, _, deltas = merge(self.conn, self.shard_locs[1])
+    self.assertEqual(deltas, 0)
+    self.assertEqual(self.counts(self.conn), self.summed())
+
+    thresholds = set(self.conn.execute("SELECT c, k, attempts, n FROM data"))
+    self.assertEqual(thresholds, {(2, 1, 500, 3), (2, 2, 500, 9), (2, 1, 1000, 3)})
+
+  def test_smallest_n(self):
+    # Shards only overlap after a change of m, and then keep the smaller V
+    self.run_shard(0, [(2, 3, 500, 12)], [])
+    self.run_shard(1, [(2, 3, 500, 11)], [])
+    for fileloc in self.shard_locs:
+      merge(self.conn, fileloc)
+    self.assertEqual(self.conn.execute("SELECT n FROM data WHERE k=3").fetchall(), [(11,)])
+    self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM provenance WHERE k=3").fetchone()[0], 2)
+
+  def test_shard_of(self):
+    self.assertEqual([shard_of(k, 3) for k in range(1, 8)], [0, 1, 2, 0, 1, 2, 0])
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from templates import specify, each, split_field, Writer
+
+class TemplateTest(unittest.TestCase):
+  def test_literal(self):
+    self.assertEqual(specify(r"\begin{tabular}{c|l} $x^{2}$ [x]", {}), r"\begin{tabular}{c|l} $x^{2}$ [x]")
+
+  def test_fields(self):
+    self.assertEqual(specify("a=[[a]], b=[[ b ]]", {"a": 1, "b": "two"}), "a=1, b=two")
+
+  def test_nested_brackets(self):
+    context = {"d": {"x": [10, 20]}, "xs": [3, 1, 2]}
+    self.assertEqual(specify('[[ d["x"][1] ]] [[ sorted(xs)[0] ]] [[ {"a": (1, 2)}["a"][0] ]]', context), "20 1 1")
+
+  def test_colon_inside(self):
+    context = {"x": 2.5, "f": lambda y, g: g(y)}
+    self.assertEqual(specify('[[ "{:.2f}".format(x) ]]', context), "2.50")
+    self.assertEqual(specify("[[ f(x, lambda z: z * 2) ]]", context), "5.0")
+    self.assertEqual(specify("[[ {1: 'a'}[1] ]] [[ 'b:c' ]]", context), "a b:c")
+
+  def test_format_spec(self):
+    self.assertEqual(specify("[[ x:.3f ]]|[[ n:>4 ]]", {"x": 1 / 3, "n": 7}), "0.333|   7")
+
+  def test_conversion(self):
+    self.assertEqual(specify("[[ s!r ]] [[ s!r:>6 ]] [[ s!s ]]", {"s": "ab"}), "'ab'   'ab' ab")
+    self.assertEqual(specify("[[ a != b ]]", {"a": 1, "b": 2}), "True")
+    self.assertEqual(split_field(" x!r:>3 "), (" x", "r", ">3"))
+    with self.assertRaises(SyntaxError):
+      specify("[[ s!q ]]", {"s": ""})
+
+  def test_interval(self):
+    self.assertEqual(specify("$[[[lo]], [[hi]]]$", {"lo": 1, "hi": 2}), "$[1, 2]$")
+    self.assertEqual(specify("[[[[x]]", {"x": 0}), "[[0")
+
+  def test_unclosed(self):
+    with self.assertRaises(SyntaxError):
+      specify("a [[ b ] c", {"b": 1})
+
+  def test_each(self):
+    self.assertEqual(each(r"[[a]] & [[v]] \\", [{"a": 1, "v": 4}, {"a": 2, "v": 5}], sep="\n"), "1 & 4 \\\\\n2 & 5 \\\\")
+
+  def test_writer(self):
+    with tempfile.TemporaryDirectory() as dirloc:
+      fileloc = os.path.join(dirloc, "paper.tex")
+      writer = Writer(fileloc)
+      writer.write("a")
+      writer.write("b")
+      self.assertFalse(os.path.exists(fileloc))
+      writer.close()
+      with open(fileloc) as f:
+        self.assertEqual(f.read(), "a\nb")
+
+if __name__ == "__main__":
+  unittest.main()
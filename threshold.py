@@ -0,0 +1,93 @@
+"""
+Usage:
+  threshold <k> <attempts> [--seed=<s>] [--witnesses=<d>]
+
+Options:
+  -h --help        Show help
+  --seed=<s>       Seed for the random generator
+  --witnesses=<d>  Archive to keep any colorings without a MAS(k) found in
+
+Find V(c, k, a), the first n for which zeta_a(c, n, k) = 1.
+
+Unlike the trials loop in trials.nim, which runs every attempt for every n
+from k upwards, an (n, k, a) check here stops at the first coloring without a
+MAS(k), and n is found by galloping then bisecting. Both rely on the paper's
+assumption that zeta_a(c, n, k) = 1 implies zeta_a(c, n + 1, k) = 1.
+"""
+
+import numpy as np
+
+from mas import has_mas, random_colorings
+
+def sample_until_failure(c, n, k, attempts, rng=None, batch=1 << 16):
+  """
+  Sample up to `attempts` colorings, stopping at the first without a MAS(k).
+  Returns (trials, successes, witness) where witness is that coloring, packed,
+  if one was found. Batches start small and double so that failing n are cheap.
+  """
+  assert c == 2
+  rng = rng or np.random.default_rng()
+  trials = successes = 0
+  size = min(256, batch)
+  while trials < attempts:
+    size = min(size, attempts - trials)
+    cols = random_colorings(rng, size, n)
+    found = has_mas(cols, n, k)
+    trials += size
+    successes += int(found.sum())
+    if successes < trials:
+      return trials, successes, cols[np.argmin(found)]
+    size = min(size * 2, batch)
+  return trials, successes, None
+
+def all_have_mas(c, n, k, attempts, rng=None, batch=1 << 16):
+  """ Is zeta_attempts(c, n, k) = 1? Returns a (verdict, witness) pair """
+  trials, successes, witness = sample_until_failure(c, n, k, attempts, rng, batch)
+  return successes == trials, witness
+
+def find_v(c, k, attempts, rng=None, lo=None, passes=None):
+  """
+  Find V(c, k, attempts). `lo` is an n known (or assumed) to have
+  zeta_a < 1, e.g. V for a smaller a; the search starts just above it.
+  `passes(n)` decides whether zeta_a(c, n, k) = 1 and defaults to sampling.
+  """
+  rng = rng or np.random.default_rng()
+  passes = passes or (lambda n: all_have_mas(c, n, k, attempts, rng)[0])
+
+  # Gallop upwards until some n passes...
+  fail = k - 1 if lo is None else lo
+  stride = 1
+  while not passes(fail + stride):
+    fail += stride
+    stride *= 2
+  success = fail + stride
+
+  # ...then bisect between the last failure and the first success
+  while success - fail > 1:
+    mid = (fail + success) // 2
+    if passes(mid):
+      success = mid
+    else:
+      fail = mid
+  return success
+
+if __name__ == "__main__":
+  from docopt import docopt
+
+  clargs = docopt(__doc__)
+  k, attempts = int(clargs["<k>"]), int(clargs["<attempts>"])
+  seed = clargs["--seed"]
+  rng = np.random.default_rng(None if seed is None else int(seed))
+
+  if clargs["--witnesses"]:
+    from witnesses import Archive
+    archive = Archive(clargs["--witnesses"])
+
+  def archiving_passes(n):
+    verdict, witness = all_have_mas(2, n, k, attempts, rng)
+    if witness is not None:
+      archive.add(2, n, k, witness)
+    return verdict
+
+  passes = archiving_passes if clargs["--witnesses"] else None
+  print(f"V(2, {k}, {attempts}) = {find_v(2, k, attempts, rng, passes=passes)}")
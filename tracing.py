@@ -0,0 +1,103 @@
+"""
+Timing instrumentation for paper builds.
+
+Stages are timed with `span`, and quantities like fit evaluations and bytes
+written are tallied with `count`. `save` writes everything out in the Chrome
+trace event format, which chrome://tracing and Perfetto open as a timeline.
+
+Jobs run in worker processes should go through `submit` rather than
+`pool.submit`: the job is then timed in its worker, and whatever it records
+there is sent back with its result and merged into this process's trace.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter_ns
+
+import rapidjson as json
+
+def now():
+  """ Microseconds on a clock shared by the workers forked from this process """
+  return perf_counter_ns() // 1000
+
+class Tracer:
+  def __init__(self):
+    self.events = []
+    self.totals = {}
+    # Jobs may be collected from several threads at once
+    self.lock = threading.Lock()
+
+  @contextmanager
+  def span(self, name, **args):
+    start = now()
+    try:
+      yield
+    finally:
+      self.events.append({
+        "name": name, "ph": "X", "ts": start, "dur": now() - start,
+        "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+      })
+
+  def count(self, name, value, ts=None):
+    """ Add to a running total, plotted as a counter over time """
+    with self.lock:
+      self.totals[name] = self.totals.get(name, 0) + value
+      self.events.append({
+        "name": name, "ph": "C", "ts": now() if ts is None else ts,
+        "pid": os.getpid(), "args": {name: self.totals[name]},
+      })
+
+  def merge(self, events):
+    """ Add events recorded by another process, re-totalling its counters """
+    for event in events:
+      if event["ph"] == "C":
+        self.count(event["name"], event["increment"], event["ts"])
+      else:
+        self.events.append(event)
+
+  def save(self, fileloc):
+    with open(fileloc, "w") as f:
+      json.dump({"traceEvents": self.events, "otherData": {"totals": self.totals}}, f)
+    return os.path.getsize(fileloc)
+
+class WorkerTracer(Tracer):
+  """ Records counter increments rather than totals, for merging """
+
+  def count(self, name, value, ts=None):
+    self.events.append({"name": name, "ph": "C", "ts": now() if ts is None else ts, "increment": value})
+
+tracer = Tracer()
+
+def span(name, **args):
+  return tracer.span(name, **args)
+
+def count(name, value):
+  tracer.count(name, value)
+
+def traced(name, args, job, *job_args):
+  """ Run a job in a worker, returning its result and what it recorded """
+  global tracer
+  tracer = WorkerTracer()
+  with tracer.span(name, **args):
+    result = job(*job_args)
+  return result, tracer.events
+
+class TracedFuture:
+  def __init__(self, future):
+    self.future = future
+    self.merged = False
+
+  def result(self):
+    result, events = self.future.result()
+    if not self.merged:
+      tracer.merge(events)
+      self.merged = True
+    return result
+
+def submit(pool, name, job, *job_args, **args):
+  """ Like `pool.submit(job, *job_args)`, but traced as a span `name` with `args` """
+  return TracedFuture(pool.submit(traced, name, args, job, *job_args))
+
+def save(fileloc):
+  return tracer.save(fileloc)
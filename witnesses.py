@@ -0,0 +1,158 @@
+"""
+Usage:
+  witnesses [<k>] [--c=<c>] [--dir=<d>] [--show]
+
+Options:
+  -h --help  Show help
+  --c=<c>    Number of colors [default: 2]
+  --dir=<d>  Directory of the archive [default: witnesses]
+  --show     Print the colorings themselves
+
+Archive of colorings without a MAS(k), the "if such a 2-coloring exists, what
+it is" of compass.txt. A single one of size n proves W(c, k) > n.
+
+Colorings are appended, packed like `TwoColoring.data`, to witnesses.bin, and
+witnesses.idx records (c, n, k, offset) for each, offset being in words.
+Neither file is ever rewritten, so a crash can at worst leave colorings
+without index entries, and the colorings are read through a memory map so
+looking one up does not read the rest. Appends hold a lock on witnesses.bin,
+so runners sharing an archive neither interleave nor duplicate them. Of a
+coloring, its color swap, its mirror image, and the swapped mirror image,
+only the smallest is stored, and only once.
+"""
+
+import fcntl
+import os
+
+import numpy as np
+
+from mas import word_count, valid_mask, has_mas, pack, unpack, to_string
+
+INDEX = np.dtype([("c", "<i8"), ("n", "<i8"), ("k", "<i8"), ("offset", "<i8")])
+
+def canonical(row, n):
+  """ The smallest of a packed coloring's images under color swap and reversal """
+  valid = valid_mask(n, len(row))
+  mirror = pack(unpack(row, n)[::-1])
+  images = (row, ~row & valid, mirror, ~mirror & valid)
+  # Compare as numbers, most significant word first
+  return min(images, key=lambda image: image[::-1].tolist())
+
+class Archive:
+  def __init__(self, dirloc="witnesses"):
+    os.makedirs(dirloc, exist_ok=True)
+    self.data_loc = os.path.join(dirloc, "witnesses.bin")
+    self.index_loc = os.path.join(dirloc, "witnesses.idx")
+
+    self.index = np.empty(0, dtype=INDEX)
+    self.by_key = {}
+    # Colorings already stored per key, for deduplication; read on first add
+    self.seen = {}
+    self.data = None
+    self.refresh()
+
+  def refresh(self):
+    """ Read the index records appended since, e.g. by another process """
+    if not os.path.isfile(self.index_loc):
+      return
+    with open(self.index_loc, "rb") as f:
+      f.seek(len(self.index) * INDEX.itemsize)
+      raw = f.read()
+    # A crash mid-append can leave a partial record at the end
+    records = np.frombuffer(raw[:len(raw) - len(raw) % INDEX.itemsize], dtype=INDEX)
+    self.extend(records)
+
+  def extend(self, records):
+    start = len(self.index)
+    self.index = np.concatenate([self.index, records])
+    for i, (c, n, k, offset) in enumerate(records.tolist(), start):
+      self.by_key.setdefault((c, n, k), []).append(i)
+      if (c, n, k) in self.seen:
+        self.seen[c, n, k].add(self.words()[offset:offset + word_count(n)].tobytes())
+
+  def words(self):
+    """ The whole data file as a memory-mapped array of words """
+    size = os.path.getsize(self.data_loc) // 8 if os.path.isfile(self.data_loc) else 0
+    if self.data is None or len(self.data) < size:
+      self.data = np.memmap(self.data_loc, dtype="<u8", mode="r") if size else np.empty(0, dtype="<u8")
+    return self.data
+
+  def __contains__(self, key):
+    return key in self.by_key
+
+  def get(self, c, n, k):
+    """ (count, words) array of the colorings stored for (c, n, k) """
+    offsets = self.index["offset"][self.by_key.get((c, n, k), [])]
+    words = word_count(n)
+    data = self.words()
+    return np.array([data[offset:offset + words] for offset in offsets], dtype=np.uint64).reshape(-1, words)
+
+  def largest(self, c, k):
+    """ The largest n with a coloring stored for k, or None """
+    return max((n for c_, n, k_ in self.by_key if (c_, k_) == (c, k)), default=None)
+
+  def nearest(self, c, n, k):
+    """ (m, row) for a coloring of the largest size m <= n stored for k, or None """
+    sizes = [m for c_, m, k_ in self.by_key if (c_, k_) == (c, k) and m <= n]
+    if not sizes:
+      return None
+    m = max(sizes)
+    return m, self.get(c, m, k)[0]
+
+  def add(self, c, n, k, row):
+    """ Store a packed coloring without a MAS(k); False if already stored """
+    assert c == 2
+    row = np.asarray(row, dtype=np.uint64)
+    if has_mas(row[None, :], n, k)[0]:
+      raise ValueError(f"{to_string(row, n)} contains a MAS({k}).")
+    row = canonical(row, n)
+
+    key = (c, n, k)
+    with open(self.data_loc, "ab") as f:
+      # Several runners may share an archive: the lock keeps each coloring
+      # next to its index record, and under it the other runners' records
+      # are read before deduplicating
+      fcntl.flock(f, fcntl.LOCK_EX)
+      try:
+        self.refresh()
+        if key not in self.seen:
+          self.seen[key] = {stored.tobytes() for stored in self.get(c, n, k)}
+        if row.tobytes() in self.seen[key]:
+          return False
+
+        offset = f.seek(0, os.SEEK_END) // 8
+        f.write(row.astype("<u8").tobytes())
+        f.flush()
+        record = np.array([(c, n, k, offset)], dtype=INDEX)
+        with open(self.index_loc, "ab") as index:
+          index.write(record.tobytes())
+      finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+    self.extend(record)
+    return True
+
+  def add_all(self, rows):
+    """ Store (c, n, k, row)s; returns how many were new """
+    return sum(self.add(*row) for row in rows)
+
+if __name__ == "__main__":
+  from docopt import docopt
+
+  clargs = docopt(__doc__)
+  archive = Archive(clargs["--dir"])
+  c = int(clargs["--c"])
+  ks = sorted({k for c_, n, k in archive.by_key if c_ == c})
+  if clargs["<k>"] is not None:
+    ks = [int(clargs["<k>"])]
+
+  for k in ks:
+    for n in sorted(n for c_, n, k_ in archive.by_key if (c_, k_) == (c, k)):
+      rows = archive.get(c, n, k)
+      print(f"[c={c}] [n={n}] [k={k}] :: {len(rows)} stored")
+      if clargs["--show"]:
+        for row in rows:
+          print(f"  {to_string(row, n)}")
+    largest = archive.largest(c, k)
+    if largest is not None:
+      print(f"W({c}, {k}) > {largest}")
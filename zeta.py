@@ -0,0 +1,79 @@
+"""
+Vectorized, log-domain evaluation of the deductive approximation of zeta.
+
+The approximation is 1 - (1 - c^(1-k))^E for an exponent E built from the
+number of arithmetic subsequences per coloring. Evaluated directly, c^n and
+the power overflow or round to 0 and 1 once n is in the hundreds, which is
+where V lives for k >= 5. Here everything is carried as log(1 - zeta), so
+whole (n, k) grids evaluate without overflow and without Python loops.
+"""
+
+import numpy as np
+
+def epsilon(n, k):
+  """
+  The exact epsilon := sum_{p_0 = 1}^{n-k+1} mod(n - p_0, k - 1) / (k - 1).
+  n - p_0 runs over k-1 .. n-1, so the sum is a difference of sums of j mod m
+  over 0 .. N-1, which have a closed form.
+  """
+  n, k = np.broadcast_arrays(np.asarray(n, dtype=np.int64), np.asarray(k, dtype=np.int64))
+  m = np.maximum(k - 1, 1)
+
+  def mod_sum(N):
+    q, r = np.divmod(N, m)
+    return q * (m * (m - 1) // 2) + r * (r - 1) // 2
+
+  result = (mod_sum(n) - mod_sum(m)) / m
+  return np.where((n >= k) & (k >= 2), result, 0.0)
+
+def as_per_coloring(n, k, exact_epsilon=True):
+  """ #AS/col = (n^2 - n) / (2(k - 1)) + (2 - k) / 2 - epsilon """
+  n, k = np.broadcast_arrays(np.asarray(n, dtype=np.float64), np.asarray(k, dtype=np.float64))
+  with np.errstate(divide="ignore", invalid="ignore"):
+    count = (n ** 2 - n) / (2 * (k - 1)) + (2 - k) / 2
+  if exact_epsilon:
+    count = count - epsilon(n, k)
+  return np.where(n >= k, count, 0.0)
+
+def log1m_appx_zeta(n, k, c=2.0, colorings=True, exact_epsilon=True):
+  """
+  log(1 - appx_zeta(n, k)). With `colorings`, the exponent is #col * #AS/col
+  as in paper.py's appx_zeta; without, it is #AS/col as in the paper's text.
+  """
+  n, k = np.broadcast_arrays(np.asarray(n, dtype=np.float64), np.asarray(k, dtype=np.float64))
+  with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+    # log(exponent) + log(-log(1 - p)), then log(1 - zeta) = -exp of their sum
+    log_exponent = np.log(as_per_coloring(n, k, exact_epsilon))
+    if colorings:
+      log_exponent = log_exponent + n * np.log(c)
+    log_rate = np.log(-np.log1p(-c ** (1 - k)))
+    result = -np.exp(log_exponent + log_rate)
+  # A single color position is always a MAS(1)
+  result = np.where(k == 1, np.where(n >= 1, -np.inf, 0.0), result)
+  return np.where(np.isnan(result), 0.0, result)
+
+def appx_zeta(n, k, c=2.0, colorings=True, exact_epsilon=True):
+  """ zeta approximation derived deductively """
+  return -np.expm1(log1m_appx_zeta(n, k, c, colorings, exact_epsilon))
+
+def predicted_v(k, attempts, n_max, c=2.0, colorings=False):
+  """
+  For each (k, attempts), the first n <= n_max at which zeta_attempts is
+  more likely than not to be 1 if zeta were the approximation, i.e. at which
+  appx_zeta ^ attempts >= 1/2. n_max + 1 where that is never the case.
+  """
+  k, attempts = np.broadcast_arrays(np.asarray(k, dtype=np.int64), np.asarray(attempts, dtype=np.float64))
+  ns = np.arange(1, n_max + 1)
+  ks = np.unique(k)
+  # log(1 - zeta) over the whole grid, one column per distinct k
+  grid = log1m_appx_zeta(ns[:, None], ks[None, :], c, colorings)
+
+  # zeta^a >= 1/2  <=>  log(1 - zeta) <= log(1 - 2^(-1/a)), and log(1 - zeta)
+  # only decreases with n, so each threshold is a binary search down a column
+  bounds = np.log(-np.expm1(-np.log(2) / attempts))
+  result = np.empty(len(k), dtype=np.int64)
+  columns = np.searchsorted(ks, k)
+  for col in range(len(ks)):
+    rows = columns == col
+    result[rows] = ns[0] + np.searchsorted(-grid[:, col], -bounds[rows])
+  return result